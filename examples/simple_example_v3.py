@@ -1,6 +1,5 @@
 import os
 import sys
-import cv2
 import pygame
 import numpy as np
 
@@ -24,6 +23,7 @@ sys.path.append(f'{dir_path}/..')
 
 from eyeGestures.utils import VideoCapture
 from eyeGestures import EyeGestures_v3
+from eyeGestures.frame import Frame
 
 gestures = EyeGestures_v3()
 cap = VideoCapture(0)
@@ -70,21 +70,23 @@ while running:
 
 
     # Generate new random position for the cursor
-    ret, frame = cap.read()
-    frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    ret, frame, timestamp, sequence = cap.readStamped()
+    # raw BGR camera frame, step converts colors once and mirrors coordinates
+    frame = Frame(frame, "BGR", mirrored=True)
 
-    # frame = np.rot90(frame)
-    frame = np.flip(frame, axis=1)
     calibrate = (iterator <= n_points) # calibrate 25 points
-    event, calibration = gestures.step(frame, calibrate, screen_width, screen_height, context="my_context")
+    event, calibration = gestures.step(frame, calibrate, screen_width, screen_height, context="my_context",
+                                       timestamp=timestamp, sequence=sequence)
 
     if event is None:
         continue
 
 
     screen.fill((0, 0, 0))
-    frame = pygame.surfarray.make_surface(frame)
-    frame = pygame.transform.scale(frame, (400, 400))
+    # preview reuses RGB conversion cached by step, mirrored copy for display
+    preview = np.flip(frame.getRGB(), axis=1)
+    preview = pygame.surfarray.make_surface(preview)
+    preview = pygame.transform.scale(preview, (400, 400))
 
     if event is not None or calibration is not None:
         # Display frame on Pygame screen
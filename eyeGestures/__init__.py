@@ -1,75 +1,176 @@
-from eyeGestures.face import FaceFinder, Face
-from eyeGestures.Fixation import Fixation
+from eyeGestures.face import FaceFinder, Face, KeyframeScheduler
+from eyeGestures.eye import Eye
+from eyeGestures.faceTracker import FaceTracker
+from eyeGestures.events import EventClassifier
 from eyeGestures.gazeEstimator import GazeTracker
 import eyeGestures.screenTracker.dataPoints as dp
 from eyeGestures.calibration_v1 import Calibrator as Calibrator_v1
 from eyeGestures.calibration_v2 import Calibrator as Calibrator_v2
-from eyeGestures.gevent import Gevent, Cevent
-from eyeGestures.utils import timeit, Buffor, low_pass_filter_fourier, recoverable
+from eyeGestures.gevent import Gevent, Cevent, NoFace
+from eyeGestures.frame import Frame
+from eyeGestures.pipeline import Pipeline
+from eyeGestures.context import TrackerContext
+from eyeGestures.latency import Instrumentation
+from eyeGestures.utils import timeit, Buffor, OneEuroFilter, recoverable
 import numpy as np
+import functools
 import pickle
 import time
-import cv2
+import threading
 
 VERSION = "3.0.0"
 
 class EyeGestures_v3:
-    """Main class for EyeGesture tracker. It configures and manages entire algorithm"""
-
-    def __init__(self, calibration_radius = 1000):
-        self.calibration_radius = calibration_radius 
+    """Main class for EyeGesture tracker. It configures and manages entire algorithm.
+
+    Every context (stream) keeps its state in own TrackerContext, with own
+    face mesh instance. step is thread-safe: steps of different contexts can
+    run concurrently from thread pool, steps of the same context are
+    serialized by lock of the context.
+    """
+
+    # key points of both eyes, head scale and head offset
+    KEY_POINTS = len(Eye.LEFT_EYE_KEYPOINTS) + len(Eye.RIGHT_EYE_KEYPOINTS) + 2
+
+    def __init__(self, calibration_radius = 1000, tracking = False, images = True, max_num_faces = 1,
+                 keyframe_interval = 1, backend = None, adaptive_scale = False,
+                 filter_min_cutoff = 1.0, filter_beta = 0.05, average_window = 20,
+                 fixation_radius = 100, fixation_time = 1.5, saccade_min_velocity = 500.0,
+                 face_max_missing = 150, remove_lost_faces = False):
+        self.calibration_radius = calibration_radius
+        self.average_window = average_window
+        self.images = images
 
-        self.clb = dict() # Calibrator_v2()
         self.cap = None
 
-        self.calibration = dict()
-
-        self.average_points = dict()
         self.iterator = dict()
-        self.filled_points= dict()
         self.enable_CN = False
         self.calibrate_gestures = False
 
-        self.finder = FaceFinder()
-        self.face = Face()
+        # configuration of per context finders, with adaptive_scale face mesh
+        # runs on frames downscaled to face size
+        self.tracking = tracking
+        self.max_num_faces = max_num_faces
+        # stepFaces forgets identity after face_max_missing frames without it, its
+        # context (with calibration) is removed only with remove_lost_faces
+        self.face_max_missing = face_max_missing
+        self.remove_lost_faces = remove_lost_faces
+        self.adaptive_scale = adaptive_scale
+        self.backend = backend
+        self.backend_used = False
+        # with keyframe_interval > 1 face mesh runs at most every keyframe_interval
+        # frames, eye landmarks are propagated by optical flow in between
+        self.keyframe_interval = keyframe_interval
 
-        # this has to be contexted
-        self.prev_timestamp     = dict()
-        self.prev_point         = dict()
         self.fix                = dict()
-        self.velocity_max       = dict()
-        self.velocity_min       = dict()
-        self.fixationTracker    = dict()
-        self.key_points_buffer  = dict()
-
-        self.starting_head_position = np.zeros((1,2))
-        self.starting_size = np.zeros((1,2))
+        # key points are smoothed over time with One Euro filter,
+        # filter_min_cutoff = None disables filtering
+        self.filter_min_cutoff  = filter_min_cutoff
+        self.filter_beta        = filter_beta
+        # fixation grows to 1 over fixation_time seconds within fixation_radius,
+        # saccade threshold adapts to gaze noise, but is at least saccade_min_velocity (px/s)
+        self.fixation_radius    = fixation_radius
+        self.fixation_time      = fixation_time
+        self.saccade_min_velocity = saccade_min_velocity
+
+        self.contexts = dict()
+        self.contexts_lock = threading.Lock()
+
+        # per stage latency histograms, None when disabled
+        self.instrumentation = None
 
     def saveModel(self, context = "main"):
-        if context in self.clb:
-            return pickle.dumps(self.clb[context])
+        if context in self.contexts:
+            return pickle.dumps(self.contexts[context].clb)
 
     def loadModel(self,model, context = "main"):
-        self.clb[context] = pickle.loads(model)
+        """Function loading model saved by saveModel, models calibrated on different key points are rejected"""
+
+        calibrator = pickle.loads(model)
+        n_features = calibrator.getFeatureCount()
+        if n_features is not None and n_features != 2 * self.KEY_POINTS:
+            raise ValueError(f"Model was calibrated on {n_features // 2} key points, tracker uses "
+                             f"{self.KEY_POINTS}, calibrate again")
+        self.addContext(context).clb = calibrator
 
     def uploadCalibrationMap(self,points,context = "main"):
-        self.addContext(context)
-        self.clb[context].updMatrix(np.array(points))
+        self.addContext(context).clb.updMatrix(np.array(points))
 
-    def getLandmarks(self, frame):
+    def getLandmarks(self, frame, context = "main"):
 
-        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        frame = cv2.flip(frame,1)
+        # camera frames are BGR, mirroring is applied to landmarks instead of pixels
+        frame = Frame.wrap(frame, "BGR", mirrored=True)
+        tracker_context = self.addContext(context)
+        face = tracker_context.face
+        keyframes = tracker_context.keyframes
+        latency = tracker_context.latency
+
+        if keyframes is not None and not keyframes.isKeyframe():
+            confidence, motion = face.propagate(frame)
+            if keyframes.accept(confidence, motion):
+                if latency is not None:
+                    latency.mark("landmarks")
+                return self.getFaceKeyPoints(frame, face, context)
 
         # try:
-        self.face.process(
+        finder = self.getFinder(context)
+        face_mesh = finder.find(frame, face.getBoundingBox())
+        if face_mesh is None:
+            # frames without face skip all processing after detection
+            face.lose()
+            tracker_context.no_face_frames += 1
+            tracker_context.no_face_streak += 1
+            if latency is not None:
+                latency.mark("landmarks")
+            return None
+
+        tracker_context.no_face_streak = 0
+        face.process(
             frame,
-            self.finder.find(frame)
+            face_mesh,
+            finder.roi
         )
-
-        face_landmarks = self.face.getLandmarks()
-        l_eye = self.face.getLeftEye()
-        r_eye = self.face.getRightEye()
+        if keyframes is not None:
+            keyframes.keyframe(face.motion)
+        if latency is not None:
+            latency.mark("landmarks")
+        return self.getFaceKeyPoints(frame, face, context)
+
+    def getFinder(self, context = "main"):
+        """Function returning face finder of context, created with own face mesh on first use"""
+
+        tracker_context = self.addContext(context)
+        if tracker_context.finder is None:
+            # first context uses backend given by user, others get its forks
+            backend = self.backend
+            if backend is not None:
+                with self.contexts_lock:
+                    if self.backend_used:
+                        backend = backend.fork()
+                    self.backend_used = True
+            tracker_context.finder = FaceFinder(tracking=self.tracking, max_num_faces=self.max_num_faces,
+                                                backend=backend, adaptive=self.adaptive_scale)
+        return tracker_context.finder
+
+    def getKeyframeStats(self, context = "main"):
+        """Function returning numbers of face mesh keyframes and propagated frames"""
+
+        if context not in self.contexts or self.contexts[context].keyframes is None:
+            return None
+        return self.contexts[context].keyframes.getStats()
+
+    def getInferenceStats(self, context = "main"):
+        """Function returning face mesh inference scale and latency statistics"""
+
+        return self.getFinder(context).getStats()
+
+    def getFaceKeyPoints(self, frame, face, context = "main"):
+        """Function building key points of processed face, head position is normalized per context"""
+
+        tracker_context = self.addContext(context)
+        face_landmarks = face.getLandmarks()
+        l_eye = face.getLeftEye()
+        r_eye = face.getRightEye()
         l_eye_landmarks = l_eye.getLandmarks()
         r_eye_landmarks = r_eye.getLandmarks()
         blink = l_eye.getBlink() and r_eye.getBlink()
@@ -84,13 +185,13 @@ class EyeGestures_v3:
         head_offset = np.zeros((1,2))
         scale_x = 1
         scale_y = 1
-        if np.array_equal(self.starting_head_position, np.zeros((1,2))):
-            self.starting_head_position = np.array([[x_offset,y_offset]])
-            self.starting_size = np.array([[x_width,y_width]])
+        if np.array_equal(tracker_context.starting_head_position, np.zeros((1,2))):
+            tracker_context.starting_head_position = np.array([[x_offset,y_offset]])
+            tracker_context.starting_size = np.array([[x_width,y_width]])
         else:
-            head_offset = np.array([[x_offset,y_offset]]) - self.starting_head_position
-            scale_x = self.starting_size[0,0]/x_width
-            scale_y = self.starting_size[0,1]/y_width
+            head_offset = np.array([[x_offset,y_offset]]) - tracker_context.starting_head_position
+            scale_x = tracker_context.starting_size[0,0]/x_width
+            scale_y = tracker_context.starting_size[0,1]/y_width
 
         # eye_events = np.array([event.blink,event.fixation]).reshape(1, 2)
         key_points = np.concatenate((l_eye_landmarks,r_eye_landmarks,np.array([[scale_x,scale_y]]),head_offset))
@@ -103,91 +204,294 @@ class EyeGestures_v3:
         key_points[-1,0] = head_offset[:,0]
         key_points[-1,1] = head_offset[:,1]
         # print(self.starting_size,x_width,y_width)
-        subframe = frame[int(y_offset):int(y_offset+y_width),int(x_offset):int(x_offset+x_width)]
+        # face sub frame is cut lazily on first access, disabled with images=False
+        subframe = None
+        if self.images:
+            subframe = functools.partial(frame.crop, x_offset, y_offset, x_width, y_width, "RGB")
+        if tracker_context.latency is not None:
+            tracker_context.latency.mark("features")
         return key_points, blink, subframe
 
     def whichAlgorithm(self,context="main"):
-        if context in self.clb:
-            return self.clb[context].whichAlgorithm()
+        if context in self.contexts:
+            return self.contexts[context].clb.whichAlgorithm()
         else:
             return "None"
 
     def reset(self, context = "main"):
-        self.filled_points[context] = 0
-        if context in self.clb:
-           self.addContext(context)
+        if context in self.contexts:
+            self.contexts[context].filled_points = 0
 
     def setFixation(self,fix):
         self.fix = fix
 
     def addContext(self, context):
-        if context not in self.clb:
-            self.clb[context] = Calibrator_v2(self.calibration_radius)
-            self.average_points[context] = np.zeros((20,2))
-            self.filled_points[context] = 0
-            self.calibration[context] = False
-            self.prev_timestamp[context] = time.time()
-            self.prev_point[context] = np.array((0.0,0.0))
-            self.velocity_max[context] = 0
-            self.velocity_min[context] = 100000000
-            self.fixationTracker[context] = Fixation(0,0,100)
-            self.key_points_buffer[context] = []
-
-    @recoverable(ret_error_params=(None, None))
-    def step(self, frame, calibration, width, height, context="main"):
-        self.addContext(context)
-
-        self.calibration[context] = calibration
-
-        key_points, blink, sub_frame = self.getLandmarks(frame)
-
-        self.key_points_buffer[context].append(key_points)
-        if len(self.key_points_buffer[context]) > 10:
-            self.key_points_buffer[context].pop(0)
-        key_points = low_pass_filter_fourier(key_points,200)
-
-        y_point = self.clb[context].predict(key_points)
-        self.average_points[context][1:,:] = self.average_points[context][:(self.average_points[context].shape[0] - 1),:]
-        self.average_points[context][0,:] = y_point
-
-        if self.filled_points[context] < self.average_points[context].shape[0] and (y_point != np.array([0.0,0.0])).any():
-            self.filled_points[context] += 1
-        if self.filled_points[context] == 0:
-            self.filled_points[context] = 1
-
-        averaged_point = np.sum(self.average_points[context][:,:],axis=0)/(self.filled_points[context])
-
-        fixation = self.fixationTracker[context].process(
-            averaged_point[0], averaged_point[1])
-
-        duration = time.time() - self.prev_timestamp[context]
-        velocity = abs(averaged_point - self.prev_point[context])/duration
-        velocity = np.sqrt(velocity[0]**2+velocity[1]**2)
-        self.prev_point[context] = averaged_point
-        self.prev_timestamp[context] = time.time()
- 
-        self.velocity_max[context] = max(self.velocity_max[context],velocity)
-        self.velocity_min[context] = min(self.velocity_min[context],velocity)
-
-        saccades = velocity > (self.velocity_max[context])/4
-
-        if self.calibration[context] and (self.clb[context].insideClbRadius(averaged_point,width,height) or self.filled_points[context] < self.average_points[context].shape[0] * 10):
-            self.clb[context].add(key_points,self.clb[context].getCurrentPoint(width,height))
+        """Function returning TrackerContext of context, created on first use"""
+
+        tracker_context = self.contexts.get(context)
+        if tracker_context is not None:
+            return tracker_context
+
+        with self.contexts_lock:
+            if context not in self.contexts:
+                keyframes = None
+                if self.keyframe_interval > 1:
+                    keyframes = KeyframeScheduler(max_interval=self.keyframe_interval)
+                key_points_filter = None
+                if self.filter_min_cutoff is not None:
+                    key_points_filter = OneEuroFilter(self.filter_min_cutoff, self.filter_beta)
+
+                tracker_context = TrackerContext(
+                    Calibrator_v2(self.calibration_radius),
+                    Face(images=self.images, propagation=self.keyframe_interval > 1),
+                    keyframes=keyframes,
+                    average_window=self.average_window,
+                    key_points_filter=key_points_filter,
+                    events=EventClassifier(self.fixation_radius, self.fixation_time,
+                                           min_velocity=self.saccade_min_velocity))
+                if self.instrumentation is not None:
+                    tracker_context.latency = self.instrumentation.recorder(context)
+                self.contexts[context] = tracker_context
+            return self.contexts[context]
+
+    def enableInstrumentation(self, enabled = True):
+        """Function switching recording of per stage step latencies of all contexts"""
+
+        with self.contexts_lock:
+            if enabled and self.instrumentation is None:
+                self.instrumentation = Instrumentation()
+            elif not enabled:
+                self.instrumentation = None
+            for context, tracker_context in self.contexts.items():
+                tracker_context.latency = None if self.instrumentation is None else self.instrumentation.recorder(context)
+
+    def getLatencyStats(self, context = None):
+        """Function returning count, mean, p50, p95 and p99 (ms) of stages per context, None when disabled"""
+
+        if self.instrumentation is None:
+            return None
+        return self.instrumentation.getStats(context)
+
+    def dumpLatencyStats(self, path = None):
+        """Function returning latency stats of all contexts as JSON, written to path when given"""
+
+        if self.instrumentation is None:
+            return None
+        return self.instrumentation.dump(path)
+
+    def removeContext(self, context):
+        with self.contexts_lock:
+            self.contexts.pop(context, None)
+
+    def faceContext(self, identity, context = "main"):
+        """Function returning name of context assigned to face identity"""
+
+        return f"{context}_{identity}"
+
+    def stepFaces(self, frame, calibration, width, height, context="main", timestamp=None, sequence=None):
+        """Function processing every face on frame with single face mesh inference.
+
+        Faces are associated with stable identities across frames, each identity
+        has its own context named by faceContext. Identities missing for
+        face_max_missing frames are lost (see lostFaces), their contexts are
+        kept unless remove_lost_faces is set. Returns dict {identity: (gevent, cevent)}.
+        """
+
+        if timestamp is None:
+            timestamp = time.monotonic()
+        frame = Frame.wrap(frame, "BGR", mirrored=True)
+        camera_context = self.addContext(context)
+        with camera_context.lock:
+            sequence = camera_context.nextSequence(sequence)
+            finder = self.getFinder(context)
+            face_mesh = finder.find(frame)
+
+            n_faces = 0 if face_mesh is None else len(face_mesh)
+            while len(camera_context.faces) < n_faces:
+                camera_context.faces.append(Face(images=self.images))
+
+            faces = camera_context.faces[:n_faces]
+            for n, face in enumerate(faces):
+                face.process(frame, face_mesh, finder.roi, n)
+
+            if camera_context.face_tracker is None:
+                camera_context.face_tracker = FaceTracker(max_missing=self.face_max_missing)
+            tracker = camera_context.face_tracker
+            identities = tracker.update([face.getBoundingBox() for face in faces])
+            if self.remove_lost_faces:
+                for identity in tracker.lost:
+                    self.removeContext(self.faceContext(identity, context))
+
+            events = dict()
+            for face, identity in zip(faces, identities):
+                events[identity] = self._stepFace(frame, face, calibration, width, height,
+                                                  self.faceContext(identity, context), timestamp, sequence)
+            return events
+
+    def lostFaces(self, context = "main"):
+        """Function returning identities lost by last stepFaces of camera context"""
+
+        face_tracker = self.addContext(context).face_tracker
+        return [] if face_tracker is None else list(face_tracker.lost)
+
+    def _stepFace(self, frame, face, calibration, width, height, context, timestamp, sequence):
+        tracker_context = self.addContext(context)
+        with tracker_context.lock:
+            tracker_context.calibration = calibration
+            tracker_context.nextSequence(sequence)
+            if tracker_context.latency is not None:
+                tracker_context.latency.start()
+
+            key_points, blink, sub_frame = self.getFaceKeyPoints(frame, face, context)
+            return self._stepKeyPoints(key_points, blink, sub_frame, width, height, context,
+                                       timestamp, sequence)
+
+    def step(self, frame, calibration, width, height, context="main", timestamp=None, sequence=None):
+        """Function processing frame of context, returns (gevent, cevent).
+
+        timestamp is capture time of frame (time.monotonic seconds, e.g. from
+        VideoCapture.readStamped), frame is stamped on call when it is not
+        given. sequence is number of frame in stream, next number is used
+        when it is not given. For frame without face NoFace is returned,
+        which unpacks as (None, None), other errors are raised. Thread-safe,
+        steps of different contexts run concurrently.
+        """
+
+        if timestamp is None:
+            timestamp = time.monotonic()
+        tracker_context = self.addContext(context)
+        with tracker_context.lock:
+            tracker_context.calibration = calibration
+            sequence = tracker_context.nextSequence(sequence)
+            if tracker_context.latency is not None:
+                tracker_context.latency.start()
+
+            landmarks = self.getLandmarks(frame, context)
+            if landmarks is None:
+                return NoFace(context, tracker_context.no_face_frames, tracker_context.no_face_streak,
+                              timestamp, sequence)
+            key_points, blink, sub_frame = landmarks
+            return self._stepKeyPoints(key_points, blink, sub_frame, width, height, context,
+                                       timestamp, sequence)
+
+    def getNoFaceStats(self, context = "main"):
+        """Function returning numbers of frames without face of context, in total and consecutive"""
+
+        tracker_context = self.addContext(context)
+        return {"frames": tracker_context.no_face_frames, "streak": tracker_context.no_face_streak}
+
+    def pipeline(self, maxsize = 2):
+        """Function returning opt-in pipelined runner of step, see Pipeline"""
+
+        return Pipeline(self, maxsize)
+
+    def stepBatch(self, key_points, timestamps, context = "main"):
+        """Function processing recorded key points of many frames at once.
+
+        key_points is (T, n_keypoints, 2) array of key points returned by
+        getLandmarks and timestamps are T capture times in seconds. Returns
+        (points, fixations, saccades) arrays of shape (T, 2), (T,) and (T,),
+        identical to gevents of step called for each frame without
+        calibration, and context state is left as after these steps.
+        """
+
+        tracker_context = self.addContext(context)
+        with tracker_context.lock:
+            return self._stepBatch(tracker_context, key_points, timestamps)
+
+    def _stepBatch(self, tracker_context, key_points, timestamps):
+        key_points = np.asarray(key_points, dtype=float)
+        timestamps = np.asarray(timestamps, dtype=float)
+        n_frames = key_points.shape[0]
+        if n_frames == 0:
+            return np.zeros((0, 2)), np.zeros(0), np.zeros(0, dtype=bool)
+
+        average = tracker_context.average_points
+        for frame_key_points in key_points[-tracker_context.key_points_buffer.capacity:]:
+            tracker_context.key_points_buffer.add(frame_key_points)
+        if tracker_context.key_points_filter is not None:
+            key_points = tracker_context.key_points_filter.filterSequence(key_points, timestamps)
+
+        y_points = tracker_context.clb.predictBatch(key_points)
+
+        # window sums over history of averaging buffer followed by new predictions
+        history = average.getBuffer().reshape(-1, 2)
+        window = np.concatenate((np.zeros((average.capacity - len(history), 2)), history, y_points))
+        sums = np.lib.stride_tricks.sliding_window_view(window[1:], average.capacity, axis=0).sum(axis=-1)
+
+        # filled points count non zero predictions, it is never 0 after first step
+        nonzero = np.cumsum((y_points != 0.0).any(axis=1))
+        filled = tracker_context.filled_points
+        if filled == 0:
+            filled = 1
+            nonzero = nonzero - nonzero[0]
+        filled = np.minimum(filled + nonzero, average.capacity)
+        averaged_points = sums / filled[:, None]
+
+        for y_point in y_points[-average.capacity:]:
+            average.add(y_point)
+        tracker_context.filled_points = int(filled[-1])
+
+        fixations, saccades = tracker_context.events.classifyBatch(averaged_points, timestamps)
+        tracker_context.clb.post_fit()
+
+        return averaged_points, fixations, saccades
+
+    def _stepKeyPoints(self, key_points, blink, sub_frame, width, height, context, timestamp = None, sequence = None):
+
+        if timestamp is None:
+            timestamp = time.monotonic()
+        tracker_context = self.addContext(context)
+        # timer is started once per frame by step, so stages before key points are included
+        latency = tracker_context.latency
+
+        tracker_context.key_points_buffer.add(key_points)
+        if tracker_context.key_points_filter is not None:
+            key_points = tracker_context.key_points_filter.filter(key_points, timestamp)
+        if latency is not None:
+            latency.mark("filter")
+
+        y_point = tracker_context.clb.predict(key_points)
+        if latency is not None:
+            latency.mark("regression")
+        tracker_context.average_points.add(y_point)
+
+        if tracker_context.filled_points < tracker_context.average_points.capacity and (y_point != np.array([0.0,0.0])).any():
+            tracker_context.filled_points += 1
+        if tracker_context.filled_points == 0:
+            tracker_context.filled_points = 1
+
+        averaged_point = tracker_context.average_points.getSum()/(tracker_context.filled_points)
+        if latency is not None:
+            latency.mark("averaging")
+
+        fixation, saccades = tracker_context.events.classify(averaged_point, timestamp)
+        if latency is not None:
+            latency.mark("fixation")
+
+        if tracker_context.calibration and (tracker_context.clb.insideClbRadius(averaged_point,width,height) or tracker_context.filled_points < tracker_context.average_points.capacity * 10):
+            tracker_context.clb.add(key_points,tracker_context.clb.getCurrentPoint(width,height))
         else: 
-            self.clb[context].post_fit()
+            tracker_context.clb.post_fit()
 
-        if self.calibration[context] and self.clb[context].insideAcptcRadius(averaged_point,width,height):
-            if self.clb[context].isReadyToMove():
-                self.clb[context].movePoint()
+        if tracker_context.calibration and tracker_context.clb.insideAcptcRadius(averaged_point,width,height):
+            if tracker_context.clb.isReadyToMove():
+                tracker_context.clb.movePoint()
 
         gevent = Gevent(
             point=averaged_point,
             blink=blink,
             fixation=fixation,
             saccades=saccades,
-            sub_frame=sub_frame
+            context=context,
+            sub_frame=sub_frame,
+            timestamp=timestamp,
+            sequence=sequence
         )
-        cevent = Cevent(self.clb[context].getCurrentPoint(width,height),self.clb[context].acceptance_radius, self.clb[context].calibration_radius)
+        cevent = Cevent(tracker_context.clb.getCurrentPoint(width,height),tracker_context.clb.acceptance_radius, tracker_context.clb.calibration_radius)
+        if latency is not None:
+            latency.mark("calibration")
+        gevent.processed = time.monotonic()
         return (gevent, cevent)
 
 class EyeGestures_v2:
@@ -214,6 +518,9 @@ class EyeGestures_v2:
 
         self.fix = 0.8
 
+        # per stage latency histograms, None when disabled
+        self.instrumentation = None
+
     def saveModel(self, context = "main"):
         if context in self.clb:
             return pickle.dumps(self.clb[context])
@@ -227,8 +534,8 @@ class EyeGestures_v2:
 
     def getLandmarks(self, frame, calibrate = False, context="main"):
 
-        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        frame = cv2.flip(frame,1)
+        # camera frames are BGR, mirroring is applied to landmarks instead of pixels
+        frame = Frame.wrap(frame, "BGR", mirrored=True)
         # frame = cv2.resize(frame, (360, 640))
 
         event, cevent = self.gestures.step(
@@ -276,6 +583,28 @@ class EyeGestures_v2:
     def disableCNCalib(self):
         self.enable_CN = False
 
+    def enableInstrumentation(self, enabled = True):
+        """Function switching recording of per stage step latencies"""
+
+        if enabled and self.instrumentation is None:
+            self.instrumentation = Instrumentation()
+        elif not enabled:
+            self.instrumentation = None
+
+    def getLatencyStats(self, context = None):
+        """Function returning count, mean, p50, p95 and p99 (ms) of stages per context, None when disabled"""
+
+        if self.instrumentation is None:
+            return None
+        return self.instrumentation.getStats(context)
+
+    def dumpLatencyStats(self, path = None):
+        """Function returning latency stats of all contexts as JSON, written to path when given"""
+
+        if self.instrumentation is None:
+            return None
+        return self.instrumentation.dump(path)
+
     def addContext(self, context):
         if context not in self.clb:
             self.clb[context] = Calibrator_v2(self.calibration_radius)
@@ -286,6 +615,10 @@ class EyeGestures_v2:
 
     @recoverable(ret_error_params=(None, None))
     def step(self, frame, calibration, width, height, context="main"):
+        latency = None
+        if self.instrumentation is not None:
+            latency = self.instrumentation.recorder(context)
+            latency.start()
         self.addContext(context)
 
         self.calibration[context] = calibration
@@ -295,6 +628,8 @@ class EyeGestures_v2:
         classic_point, key_points, blink, fixation, cevent = self.getLandmarks(frame,
                                                                                self.calibrate_gestures and self.enable_CN,
                                                                                context = context)
+        if latency is not None:
+            latency.mark("landmarks")
 
         margin = 10
         if (classic_point[0] <= margin) and self.calibration[context]:
@@ -309,6 +644,8 @@ class EyeGestures_v2:
             self.calibrate_gestures = False
 
         y_point = self.clb[context].predict(key_points)
+        if latency is not None:
+            latency.mark("regression")
         self.average_points[context][1:,:] = self.average_points[context][:(self.average_points[context].shape[0] - 1),:]
         if fixation <= self.fix:
             self.average_points[context][0,:] = y_point
@@ -316,7 +653,9 @@ class EyeGestures_v2:
         if self.filled_points[context] < self.average_points[context].shape[0] and (y_point != np.array([0.0,0.0])).any():
             self.filled_points[context] += 1
         averaged_point = (np.sum(self.average_points[context][:,:],axis=0) + (classic_point * self.CN))/(self.filled_points[context] + self.CN)
-        
+        if latency is not None:
+            latency.mark("averaging")
+
         if self.calibration[context] and (self.clb[context].insideClbRadius(averaged_point,width,height) or self.filled_points[context] < self.average_points[context].shape[0] * 10):
             self.clb[context].add(key_points,self.clb[context].getCurrentPoint(width,height))
         else: 
@@ -329,6 +668,8 @@ class EyeGestures_v2:
 
         gevent = Gevent(averaged_point,blink,fixation)
         cevent = Cevent(self.clb[context].getCurrentPoint(width,height),self.clb[context].acceptance_radius, self.clb[context].calibration_radius)
+        if latency is not None:
+            latency.mark("calibration")
         return (gevent, cevent)
 
 class EyeGestures_v1:
@@ -4,26 +4,183 @@ from sklearn.preprocessing import StandardScaler
 from sklearn.ensemble import RandomForestRegressor
 import asyncio
 import threading
+import time
+import collections
+
+from eyeGestures.latency import LatencyHistogram
 
 def euclidean_distance(point1, point2):
     return np.linalg.norm(point1 - point2)
 
+class RidgeModel(collections.namedtuple("RidgeModel", ["coef", "intercept"])):
+    """Immutable snapshot of fitted ridge coefficients, (outputs, d) coef and (outputs,) intercept"""
+
+    __slots__ = ()
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=float)
+        return X.reshape(-1, self.coef.shape[-1]) @ self.coef.T + self.intercept
+
+class IncrementalRidge:
+    """Ridge regression with intercept (as sklearn Ridge) fitted from running sufficient statistics.
+
+    partial_fit merges samples into feature and target means and centered
+    co-moments XᵀX and Xᵀy in O(d²) per sample, so nothing is refitted from
+    stored samples. solve computes coefficients in O(d³) only when new model
+    is needed, centering makes them equal to sklearn Ridge with same alpha.
+    Targets can have many outputs (e.g. x and y on screen), all outputs share
+    XᵀX and are solved with one factorization, coef_ has shape (outputs, d)
+    then, as in sklearn, and predict is single matrix product.
+    """
+
+    def __init__(self, alpha=1.0):
+        self.alpha = alpha
+        self.reset()
+
+    def reset(self):
+        self.n_samples = 0
+        self.mean_x = None
+        self.mean_y = None
+        self.xx = None
+        self.xy = None
+        self.coef_ = None
+        self.intercept_ = 0.0
+
+    def partial_fit(self, X, y):
+        """Function merging (n, d) samples X with (n,) or (n, outputs) targets y into statistics"""
+
+        X = np.asarray(X, dtype=float).reshape(len(y), -1)
+        y = np.asarray(y, dtype=float)
+        if self.mean_x is None:
+            self.mean_x = np.zeros(X.shape[1])
+            self.mean_y = np.zeros(y.shape[1:])
+            self.xx = np.zeros((X.shape[1], X.shape[1]))
+            self.xy = np.zeros((X.shape[1],) + y.shape[1:])
+
+        # statistics of batch combined with previous ones (Chan et al.), single
+        # sample reduces to Welford update
+        n_batch = len(y)
+        n_samples = self.n_samples + n_batch
+        mean_x = X.mean(axis=0)
+        mean_y = y.mean(axis=0)
+        centered = X - mean_x
+        delta_x = mean_x - self.mean_x
+        delta_y = mean_y - self.mean_y
+        weight = self.n_samples * n_batch / n_samples
+
+        self.xx += centered.T @ centered + weight * np.outer(delta_x, delta_x)
+        self.xy += centered.T @ (y - mean_y) + weight * np.multiply.outer(delta_x, delta_y)
+        self.mean_x += delta_x * (n_batch / n_samples)
+        self.mean_y += delta_y * (n_batch / n_samples)
+        self.n_samples = n_samples
+        return self
+
+    def solve(self):
+        """Function computing coefficients from statistics of all merged samples"""
+
+        regularized = self.xx + self.alpha * np.eye(len(self.xx))
+        coef = np.linalg.solve(regularized, self.xy)
+        self.intercept_ = self.mean_y - self.mean_x @ coef
+        self.coef_ = coef.T
+        return self
+
+    def copy(self):
+        """Function returning model with copy of statistics, to be solved without holding them"""
+
+        copied = IncrementalRidge(self.alpha)
+        copied.__dict__.update({name: value.copy() if isinstance(value, np.ndarray) else value
+                                for name, value in self.__dict__.items()})
+        return copied
+
+    def snapshot(self):
+        """Function returning read-only RidgeModel of solved coefficients"""
+
+        coef = np.array(self.coef_)
+        intercept = np.array(self.intercept_)
+        coef.setflags(write=False)
+        intercept.setflags(write=False)
+        return RidgeModel(coef, intercept)
+
+    def fit(self, X, y):
+        """Function fitting model to samples X and targets y only, as sklearn fit"""
+
+        self.reset()
+        return self.partial_fit(X, y).solve()
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=float)
+        return X.reshape(-1, self.coef_.shape[-1]) @ self.coef_.T + self.intercept_
+
+class SampleStore:
+    """Growable contiguous store of calibration samples (rows of features and 2D targets).
+
+    Samples live in preallocated float arrays doubled when full, so adding is
+    amortized O(d). Accepted samples (of points already moved past) come
+    first, pending ones (of current point) follow them, accepting pending
+    samples only moves boundary. All getters return views, no copies.
+    """
+
+    def __init__(self, capacity=256, dtype=np.float64):
+        self.capacity = capacity
+        self.dtype = dtype
+        self.features = None
+        self.targets = np.zeros((capacity, 2), dtype=dtype)
+        self.n_samples = 0
+        self.n_accepted = 0
+
+    def add(self, x, y):
+        x = np.asarray(x, dtype=self.dtype).ravel()
+        if self.features is None:
+            self.features = np.zeros((self.capacity, len(x)), dtype=self.dtype)
+        if self.n_samples == self.capacity:
+            self.capacity *= 2
+            self.features = self.__grow(self.features)
+            self.targets = self.__grow(self.targets)
+
+        self.features[self.n_samples] = x
+        self.targets[self.n_samples] = y[:2]
+        self.n_samples += 1
+
+    def accept(self):
+        """Function moving pending samples to accepted ones"""
+        self.n_accepted = self.n_samples
+
+    def accepted(self):
+        """Function returning (features, targets) views of accepted samples"""
+        return self.__view(0, self.n_accepted)
+
+    def pending(self):
+        """Function returning (features, targets) views of pending samples"""
+        return self.__view(self.n_accepted, self.n_samples)
+
+    def all(self):
+        """Function returning (features, targets) views of all samples"""
+        return self.__view(0, self.n_samples)
+
+    def __grow(self, storage):
+        grown = np.zeros((self.capacity, storage.shape[1]), dtype=self.dtype)
+        grown[:self.n_samples] = storage[:self.n_samples]
+        return grown
+
+    def __view(self, start, stop):
+        if self.features is None:
+            return np.zeros((0, 0), dtype=self.dtype), self.targets[:0]
+        return self.features[start:stop], self.targets[start:stop]
+
 class Calibrator:
 
     PRECISION_LIMIT = 50
     PRECISION_STEP = 10
     ACCEPTANCE_RADIUS = 500
+    # seconds fit worker waits for next fit request before exiting
+    FIT_IDLE_TIMEOUT = 1.0
 
     def __init__(self,CALIBRATION_RADIUS=1000):
-        self.X = []
-        self.Y_y = []
-        self.Y_x = []
-        self.__tmp_X = []
-        self.__tmp_Y_y = []
-        self.__tmp_Y_x = []
-        self.reg = None
-        self.reg_x = scireg.Ridge(alpha=0.5)
-        self.reg_y = scireg.Ridge(alpha=0.5)
+        self.samples = SampleStore()
+        # joint x and y model keeps statistics of all samples, pending and accepted
+        self.reg = IncrementalRidge(alpha=0.5)
+        # latest solved RidgeModel, replaced as whole so predict reads it without lock
+        self.model = None
         self.current_algorithm = "Ridge"
         self.fitted = False
         self.cv_not_set = True
@@ -35,39 +192,99 @@ class Calibrator:
         self.acceptance_radius = int(CALIBRATION_RADIUS/2)
         self.calibration_radius = int(CALIBRATION_RADIUS)
 
+        self.__init_runtime()
+
+    # locks, threads and fit statistics are not pickled, they are recreated on load
+    RUNTIME = ("lock", "calcualtion_coroutine", "fit_condition", "fit_worker", "fit_pending",
+               "fit_running", "fits_requested", "fits_skipped", "fit_latency")
+
+    def __init_runtime(self):
         self.lock = threading.Lock()
         self.calcualtion_coroutine = threading.Thread(target=self.__async_post_fit)
-        self.fit_coroutines = [] 
+
+        # single fit worker, requests coalesce so at most one fit runs and one is pending
+        self.fit_condition = threading.Condition()
+        self.fit_worker = None
+        self.fit_pending = False
+        self.fit_running = False
+        self.fits_requested = 0
+        self.fits_skipped = 0
+        self.fit_latency = LatencyHistogram()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for name in self.RUNTIME:
+            state.pop(name, None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__init_runtime()
 
     def __launch_fit(self):
-        coroutine = threading.Thread(target=self.__async_fit)
-        self.fit_coroutines.append(coroutine)
-        coroutine.start()
-        self.__join_finished()
+        with self.fit_condition:
+            self.fits_requested += 1
+            if self.fit_pending:
+                # latest request wins, pending fit covers previous samples too
+                self.fits_skipped += 1
+            self.fit_pending = True
+            if self.fit_worker is None:
+                self.fit_worker = threading.Thread(target=self.__fit_worker, daemon=True)
+                self.fit_worker.start()
+            self.fit_condition.notify_all()
+
+    # Worker lives while fits are requested, exits after FIT_IDLE_TIMEOUT without requests
+    def __fit_worker(self):
+        while True:
+            with self.fit_condition:
+                if not self.fit_pending:
+                    self.fit_condition.wait(self.FIT_IDLE_TIMEOUT)
+                if not self.fit_pending:
+                    self.fit_worker = None
+                    return
+                self.fit_pending = False
+                self.fit_running = True
+
+            start = time.perf_counter_ns()
+            self.__async_fit()
+            with self.fit_condition:
+                self.fit_latency.record(time.perf_counter_ns() - start)
+                self.fit_running = False
+                self.fit_condition.notify_all()
 
-    def __join_finished(self):
-        for coroutine in self.fit_coroutines:
-            if not coroutine.is_alive():
-                coroutine.join()
+    def waitFit(self, timeout=None):
+        """Function waiting until requested fits are finished, returns False on timeout"""
+
+        with self.fit_condition:
+            return self.fit_condition.wait_for(lambda: not (self.fit_pending or self.fit_running), timeout)
+
+    def getFitStats(self):
+        """Function returning numbers of requested, finished and skipped fits with fit latency (ms)"""
+
+        with self.fit_condition:
+            return {
+                "requested": self.fits_requested,
+                "fitted": self.fit_latency.count,
+                "skipped": self.fits_skipped,
+                "latency": self.fit_latency.getStats(),
+            }
 
 
     def add(self,x,y):
         with self.lock:
-            self.__tmp_X.append(x.flatten())
-            self.__tmp_Y_y.append(y[1])
-            self.__tmp_Y_x.append(y[0])
+            self.samples.add(x, y)
+            features, targets = self.samples.all()
+            self.reg.partial_fit(features[-1:], targets[-1:])
             self.__launch_fit()
 
     # This coroutine helps to asynchronously recalculate results
+    # statistics are copied under lock, solved outside and published as new snapshot
     def __async_fit(self):
         try:
             with self.lock:
-                __fit_tmp_X   = np.array(self.__tmp_X + self.X, dtype=object)
-                __fit_tmp_Y_y = np.array(self.__tmp_Y_y + self.Y_y)
-                __fit_tmp_Y_x = np.array(self.__tmp_Y_x + self.Y_x)
-                self.reg_x.fit(__fit_tmp_X,__fit_tmp_Y_x)
-                self.reg_y.fit(__fit_tmp_X,__fit_tmp_Y_y)
-                self.fitted = True
+                reg = self.reg.copy()
+            self.model = reg.solve().snapshot()
+            self.fitted = True
         except Exception as e:
             print(f"Exception as {e}")
 
@@ -77,9 +294,9 @@ class Calibrator:
             tmp_fixations_x = scireg.LassoCV(cv=50,max_iter=10000)
             tmp_fixations_y = scireg.LassoCV(cv=50,max_iter=10000)
 
-            __tmp_X   = np.array(self.X)
-            __tmp_Y_y = np.array(self.Y_y)
-            __tmp_Y_x = np.array(self.Y_x)
+            __tmp_X, __tmp_Y = self.samples.accepted()
+            __tmp_Y_y = __tmp_Y[:, 1]
+            __tmp_Y_x = __tmp_Y[:, 0]
 
             tmp_fixations_x.fit(__tmp_X,__tmp_Y_x)
             tmp_fixations_y.fit(__tmp_X,__tmp_Y_y)
@@ -99,33 +316,53 @@ class Calibrator:
             # self.calcualtion_coroutine.start()
             self.cv_not_set = False
 
+    def getFeatureCount(self):
+        """Function returning number of features of calibration samples, None before first sample"""
+
+        features = self.samples.features
+        return None if features is None else features.shape[1]
+
     def whichAlgorithm(self):
         with self.lock:
             return self.current_algorithm
 
     def predict(self,x):
-        with self.lock:
-            if self.fitted:
-                x = x.flatten()
-                x = x.reshape(1, -1)
-                y_x = self.reg_x.predict(x)[0]
-                y_y = self.reg_y.predict(x)[0]
-                return np.array([y_x,y_y])
-            else:
-                return np.array([0.0,0.0])
+        model = self.model
+        if self.fitted and model is not None:
+            # x and y with one matrix-vector product
+            return model.predict(x.flatten())[0]
+        else:
+            return np.array([0.0,0.0])
+
+    def predictBatch(self,X):
+        """Function returning (T, 2) points predicted for (T, n_keypoints, 2) stacked key points"""
+
+        X = np.asarray(X, dtype=float)
+        X = X.reshape(X.shape[0], -1)
+        model = self.model
+        if not self.fitted or model is None:
+            return np.zeros((X.shape[0], 2))
+        return model.predict(X)
 
     def movePoint(self):
         with self.lock:
-            self.X =   self.X + self.__tmp_X
-            self.Y_y = self.Y_y + self.__tmp_Y_y
-            self.Y_x = self.Y_x + self.__tmp_Y_x
+            self.samples.accept()
             self.matrix.movePoint()
-            self.__tmp_X = []
-            self.__tmp_Y_y = []
-            self.__tmp_Y_x = []
 
     def isReadyToMove(self):
-        return len(self.__tmp_X) > 30 # magic number - collect 30 points
+        return len(self.samples.pending()[1]) > 30 # magic number - collect 30 points
+
+    @property
+    def X(self):
+        return self.samples.accepted()[0]
+
+    @property
+    def Y_x(self):
+        return self.samples.accepted()[1][:, 0]
+
+    @property
+    def Y_y(self):
+        return self.samples.accepted()[1][:, 1]
 
     def getCurrentPoint(self,width,heigth):
         return self.matrix.getCurrentPoint(width,heigth)
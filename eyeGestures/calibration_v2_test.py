@@ -0,0 +1,142 @@
+import pickle
+import threading
+import numpy as np
+import sklearn.linear_model as scireg
+from eyeGestures.calibration_v2 import Calibrator, IncrementalRidge, SampleStore
+
+
+def calibration_samples(rng, n_samples):
+    # key points around face position in pixels, gaze as noisy linear function
+    X = rng.normal(300, 40, (n_samples, 64))
+    Y = X[:, :8] @ rng.normal(0, 2, (8, 2)) + rng.normal(0, 5, (n_samples, 2))
+    return X, Y
+
+
+def test_incremental_ridge_matches_sklearn():
+    rng = np.random.default_rng(0)
+    X, Y = calibration_samples(rng, 300)
+
+    ridge = IncrementalRidge(alpha=0.5)
+    for n in range(len(X)):
+        ridge.partial_fit(X[n:n + 1], Y[n:n + 1, 0])
+        # fewer samples than features are solved too
+        if n in (10, 150, 299):
+            expected = scireg.Ridge(alpha=0.5).fit(X[:n + 1], Y[:n + 1, 0])
+            ridge.solve()
+            assert np.allclose(ridge.coef_, expected.coef_, rtol=1e-6, atol=1e-9)
+            assert np.isclose(ridge.intercept_, expected.intercept_)
+            assert np.allclose(ridge.predict(X[:5]), expected.predict(X[:5]))
+
+    batch = IncrementalRidge(alpha=0.5).partial_fit(X[:100], Y[:100, 0]).partial_fit(X[100:], Y[100:, 0])
+    assert np.allclose(batch.solve().coef_, ridge.coef_)
+
+
+def test_calibrator_matches_sklearn_on_all_samples():
+    rng = np.random.default_rng(1)
+    X, Y = calibration_samples(rng, 80)
+
+    calibrator = Calibrator()
+    for n in range(len(X)):
+        calibrator.add(X[n].reshape(32, 2), Y[n])
+        if n == 40:
+            calibrator.movePoint()
+    calibrator.waitFit()
+
+    expected = np.stack([scireg.Ridge(alpha=0.5).fit(X, Y[:, n]).predict(X[:3]) for n in range(2)], axis=1)
+    assert np.allclose([calibrator.predict(x) for x in X[:3]], expected)
+    assert calibrator.whichAlgorithm() == "Ridge"
+
+
+def test_fit_requests_coalesce():
+    rng = np.random.default_rng(2)
+    X, Y = calibration_samples(rng, 20)
+    calibrator = Calibrator()
+    for n in range(len(X)):
+        calibrator.add(X[n].reshape(32, 2), Y[n])
+    assert calibrator.waitFit(timeout=10)
+
+    # fit running behind held lock leaves at most one fit pending
+    with calibrator.lock:
+        for _ in range(10):
+            calibrator._Calibrator__launch_fit()
+    assert calibrator.waitFit(timeout=10)
+
+    stats = calibrator.getFitStats()
+    assert stats["requested"] == 30
+    assert stats["fitted"] + stats["skipped"] == 30
+    assert stats["skipped"] >= 8
+    assert stats["latency"]["count"] == stats["fitted"]
+
+
+def test_sample_store_grows_and_splits_pending_samples():
+    rng = np.random.default_rng(3)
+    X, Y = calibration_samples(rng, 40)
+    store = SampleStore(capacity=4)
+    for x, y in zip(X[:25], Y[:25]):
+        store.add(x.reshape(32, 2), y)
+    store.accept()
+    for x, y in zip(X[25:], Y[25:]):
+        store.add(x, y)
+
+    assert store.capacity == 64
+    features, targets = store.all()
+    assert np.array_equal(features, X) and np.array_equal(targets, Y)
+    assert np.array_equal(store.accepted()[0], X[:25])
+    assert np.array_equal(store.pending()[1], Y[25:])
+    assert np.shares_memory(store.pending()[0], store.features)
+
+
+def test_joint_ridge_matches_separate_models():
+    rng = np.random.default_rng(4)
+    X, Y = calibration_samples(rng, 120)
+
+    joint = IncrementalRidge(alpha=0.5).fit(X, Y)
+    expected = scireg.Ridge(alpha=0.5).fit(X, Y)
+    assert joint.coef_.shape == (2, 64)
+    assert np.allclose(joint.coef_, expected.coef_, rtol=1e-6, atol=1e-9)
+    assert np.allclose(joint.intercept_, expected.intercept_)
+    assert np.allclose(joint.predict(X[:4]), expected.predict(X[:4]))
+
+
+def test_calibrator_pickles():
+    rng = np.random.default_rng(5)
+    X, Y = calibration_samples(rng, 50)
+    calibrator = Calibrator()
+    for n in range(len(X)):
+        calibrator.add(X[n], Y[n])
+        if n == 29:
+            calibrator.movePoint()
+    calibrator.waitFit()
+
+    loaded = pickle.loads(pickle.dumps(calibrator))
+    assert np.array_equal(loaded.predict(X[0]), calibrator.predict(X[0]))
+    assert loaded.whichAlgorithm() == "Ridge"
+    assert len(loaded.samples.pending()[0]) == 20
+    # fit worker and lock are recreated on load
+    loaded.add(X[0], Y[0])
+    assert loaded.waitFit(timeout=10)
+
+
+def test_predict_does_not_wait_for_fit():
+    rng = np.random.default_rng(6)
+    X, Y = calibration_samples(rng, 40)
+    calibrator = Calibrator()
+    for n in range(len(X)):
+        calibrator.add(X[n], Y[n])
+    calibrator.waitFit()
+    model = calibrator.model
+    expected = calibrator.predict(X[0])
+
+    # lock held as by running fit, predict reads published model
+    predicted = []
+    with calibrator.lock:
+        reader = threading.Thread(target=lambda: predicted.append(calibrator.predict(X[0])))
+        reader.start()
+        reader.join(timeout=5)
+        assert not reader.is_alive()
+    assert np.array_equal(predicted[0], expected)
+
+    calibrator.add(X[1], Y[1] + 100)
+    calibrator.waitFit()
+    assert calibrator.model is not model
+    assert not model.coef.flags.writeable
@@ -0,0 +1,25 @@
+import os
+import cv2
+import numpy as np
+import pytest
+from eyeGestures.calibration_v2 import Calibrator
+
+TEST_DATA = os.path.join(os.path.dirname(__file__), "..", "tests", "test_data")
+
+
+@pytest.fixture
+def face_images():
+    # read for every test, so tests may draw on images
+    return {name: cv2.imread(os.path.join(TEST_DATA, f"{name}.jpg")) for name in ["face_1", "face_2"]}
+
+
+@pytest.fixture
+def fitted_calibrator():
+    # gaze is linear function of first key points
+    rng = np.random.default_rng(0)
+    calibrator = Calibrator()
+    for _ in range(60):
+        key_points = rng.uniform(0, 100, (32, 2))
+        calibrator.add(key_points, key_points[:4].sum(axis=0) * 3)
+    calibrator.waitFit()
+    return calibrator
@@ -0,0 +1,57 @@
+"""Module providing state of single stream tracked by EyeGestures_v3."""
+
+import threading
+
+import numpy as np
+
+from eyeGestures.events import EventClassifier
+from eyeGestures.utils import RingBuffer
+
+
+class TrackerContext:
+    """Class holding all state of single tracked stream (camera or face identity).
+
+    Context owns its landmark finder (with own face mesh instance, created on
+    first use), face, keyframe scheduler, head normalization, calibrator and
+    gaze post-processing state, so contexts share no mutable state. lock
+    serializes steps of the context, steps of different contexts can run
+    concurrently.
+    """
+
+    def __init__(self, calibrator, face, keyframes=None, average_window=20, key_points_filter=None, events=None):
+        self.lock = threading.Lock()
+
+        # landmarks
+        self.finder = None
+        self.face = face
+        self.keyframes = keyframes
+        # faces pool and identity tracker used when context is camera of stepFaces
+        self.faces = [face]
+        self.face_tracker = None
+
+        # sequence of last frame, frames without face in total and consecutive
+        self.sequence = 0
+        self.no_face_frames = 0
+        self.no_face_streak = 0
+
+        # head normalization
+        self.starting_head_position = np.zeros((1, 2))
+        self.starting_size = np.zeros((1, 2))
+
+        # calibration and gaze post-processing
+        self.clb = calibrator
+        self.calibration = False
+        self.average_points = RingBuffer(average_window)
+        self.filled_points = 0
+        self.key_points_buffer = RingBuffer(10)
+        self.key_points_filter = key_points_filter
+        self.events = events if events is not None else EventClassifier()
+
+        # LatencyRecorder when instrumentation is enabled
+        self.latency = None
+
+    def nextSequence(self, sequence=None):
+        """Function returning sequence of new frame, next after previous one when not given by capture"""
+
+        self.sequence = self.sequence + 1 if sequence is None else sequence
+        return self.sequence
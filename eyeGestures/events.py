@@ -0,0 +1,165 @@
+"""Module providing timestamp driven fixation and saccade classification."""
+
+import numpy as np
+
+from eyeGestures.utils import RingBuffer
+
+
+class EventClassifier:
+    """Class classifying stream of gaze points into fixations and saccades.
+
+    Saccades are detected by velocity threshold (I-VT). Velocity is computed
+    from capture timestamps of points, threshold adapts to noise of tracker:
+    it is mean + deviations * std of velocities of last window points (kept
+    in ring buffer with running sums, so update is O(1)), never lower than
+    min_velocity. Fixations are detected by dispersion (I-DT): point within
+    radius of centroid of current fixation extends it, otherwise (or on
+    saccade) new fixation starts. Fixation value grows from 0 to 1 over
+    fixation_time seconds, so it does not depend on frame rate.
+
+    classify processes single point, classifyBatch processes recorded
+    session at once with identical results and final state.
+    """
+
+    def __init__(self, radius=100, fixation_time=1.5, window=30, deviations=3.0, min_velocity=500.0):
+        self.radius = radius
+        self.fixation_time = fixation_time
+        self.deviations = deviations
+        self.min_velocity = min_velocity
+        # velocities and their squares of last window points
+        self.velocities = RingBuffer(window)
+        self.reset()
+
+    def reset(self):
+        self.velocities.clear()
+        self.prev_point = None
+        self.prev_timestamp = None
+        self.velocity = 0.0
+        self.threshold = self.min_velocity
+
+        # current fixation
+        self.fixation = 0.0
+        self.fixation_start = None
+        self.fixation_sum = np.zeros(2)
+        self.fixation_count = 0
+
+    def classify(self, point, timestamp):
+        """Function processing gaze point captured at timestamp (s), returns (fixation, saccade)"""
+
+        point = np.asarray(point, dtype=float)
+
+        velocity = 0.0
+        if self.prev_point is not None and timestamp > self.prev_timestamp:
+            velocity = float(np.linalg.norm(point - self.prev_point)) / (timestamp - self.prev_timestamp)
+        self.prev_point = point
+        self.prev_timestamp = timestamp
+
+        if self.velocities.getLen() > 0:
+            self.threshold = float(self.__threshold(self.velocities.getSum(), self.velocities.getLen()))
+        saccade = velocity > self.threshold
+        self.velocities.add((velocity, velocity * velocity))
+        self.velocity = velocity
+
+        if saccade or self.fixation_count == 0 or \
+                np.linalg.norm(point - self.fixation_sum / self.fixation_count) >= self.radius:
+            self.fixation_start = timestamp
+            self.fixation_sum = point.copy()
+            self.fixation_count = 1
+            self.fixation = 0.0
+        else:
+            self.fixation_sum += point
+            self.fixation_count += 1
+            self.fixation = min((timestamp - self.fixation_start) / self.fixation_time, 1.0)
+
+        return self.fixation, saccade
+
+    def classifyBatch(self, points, timestamps):
+        """Function processing (T, 2) points with T timestamps, equivalent to calling classify for each point.
+
+        Returns (fixations, saccades) arrays of shape (T,). Velocities and
+        thresholds are computed with window sums over whole session, python
+        loop runs once per fixation change.
+        """
+
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        timestamps = np.asarray(timestamps, dtype=float)
+        n_points = len(points)
+        if n_points == 0:
+            return np.zeros(0), np.zeros(0, dtype=bool)
+
+        # velocities against previous point of session (or of previous call)
+        if self.prev_point is None:
+            previous_points = np.concatenate((points[:1], points[:-1]))
+            previous_timestamps = np.concatenate((timestamps[:1], timestamps[:-1]))
+        else:
+            previous_points = np.concatenate((self.prev_point[None], points[:-1]))
+            previous_timestamps = np.concatenate(([self.prev_timestamp], timestamps[:-1]))
+        durations = timestamps - previous_timestamps
+        distances = np.linalg.norm(points - previous_points, axis=1)
+        velocities = np.zeros(n_points)
+        np.divide(distances, durations, out=velocities, where=durations > 0)
+
+        # thresholds from sums of velocities in window preceding every point
+        history = self.velocities.getBuffer().reshape(-1, 2)
+        window = np.concatenate((history, np.stack((velocities, velocities * velocities), axis=1)))
+        sums = np.concatenate((np.zeros((1, 2)), np.cumsum(window, axis=0)))
+        ends = np.arange(len(history), len(history) + n_points)
+        starts = np.maximum(ends - self.velocities.capacity, 0)
+        thresholds = self.__threshold(sums[ends] - sums[starts], ends - starts)
+        saccades = velocities > thresholds
+
+        for velocity in velocities[-self.velocities.capacity:]:
+            self.velocities.add((velocity, velocity * velocity))
+        self.prev_point = points[-1]
+        self.prev_timestamp = timestamps[-1]
+        self.velocity = velocities[-1]
+        self.threshold = thresholds[-1]
+
+        fixations = np.empty(n_points)
+        start = 0
+        while start < n_points:
+            # first point leaving current fixation, searched in growing chunks
+            end = n_points
+            if self.fixation_count > 0:
+                chunk = 64
+                position = start
+                fixation_sum = self.fixation_sum
+                fixation_count = self.fixation_count
+                while position < n_points:
+                    stop = min(position + chunk, n_points)
+                    # centroid of fixation before every point of chunk
+                    sums = fixation_sum + np.cumsum(points[position:stop], axis=0) - points[position:stop]
+                    centroids = sums / (fixation_count + np.arange(stop - position))[:, None]
+                    outside = saccades[position:stop] | \
+                        (np.linalg.norm(points[position:stop] - centroids, axis=1) >= self.radius)
+                    if outside.any():
+                        end = position + int(np.argmax(outside))
+                        break
+                    fixation_sum = sums[-1] + points[stop - 1]
+                    fixation_count += stop - position
+                    position = stop
+                    chunk *= 2
+            else:
+                end = start
+
+            if end > start:
+                fixations[start:end] = np.minimum((timestamps[start:end] - self.fixation_start) / self.fixation_time, 1.0)
+                self.fixation_sum = self.fixation_sum + points[start:end].sum(axis=0)
+                self.fixation_count += end - start
+                self.fixation = fixations[end - 1]
+
+            if end < n_points:
+                self.fixation_start = timestamps[end]
+                self.fixation_sum = points[end].copy()
+                self.fixation_count = 1
+                self.fixation = 0.0
+                fixations[end] = 0.0
+            start = end + 1
+
+        return fixations, saccades
+
+    def __threshold(self, sums, counts):
+        counts = np.maximum(counts, 1)
+        mean = sums[..., 0] / counts
+        std = np.sqrt(np.maximum(sums[..., 1] / counts - mean * mean, 0.0))
+        return np.maximum(mean + self.deviations * std, self.min_velocity)
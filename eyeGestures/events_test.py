@@ -0,0 +1,51 @@
+import numpy as np
+from eyeGestures.events import EventClassifier
+
+
+def gaze_session(rng, n_points, fps=30.0):
+    # fixations with noise, separated by jumps across screen
+    targets = rng.uniform(0, 1000, (n_points // 40 + 1, 2))
+    points = np.repeat(targets, 40, axis=0)[:n_points] + rng.normal(0, 3, (n_points, 2))
+    timestamps = 10.0 + np.cumsum(rng.uniform(0.8, 1.2, n_points) / fps)
+    return points, timestamps
+
+
+def test_fixation_does_not_depend_on_frame_rate():
+    for fps in (16.0, 30.0, 120.0):
+        classifier = EventClassifier(fixation_time=1.0)
+        for n in range(int(fps / 2) + 1):
+            fixation, saccade = classifier.classify((500.0, 500.0), n / fps)
+        assert np.isclose(fixation, 0.5)
+        assert not saccade
+
+
+def test_saccade_threshold_adapts_to_noise():
+    rng = np.random.default_rng(0)
+    quiet = EventClassifier(min_velocity=50.0)
+    noisy = EventClassifier(min_velocity=50.0)
+    for n in range(60):
+        quiet.classify(rng.normal(500, 0.2, 2), n / 30)
+        noisy.classify(rng.normal(500, 10.0, 2), n / 30)
+
+    assert quiet.threshold == 50.0
+    assert noisy.threshold > 3 * 50.0
+    # jump of 30 px in one frame is saccade only for quiet tracker
+    assert quiet.classify(quiet.prev_point + (30.0, 0.0), 2.0)[1]
+    assert not noisy.classify(noisy.prev_point + (30.0, 0.0), 2.0)[1]
+
+
+def test_classify_batch_matches_classify():
+    rng = np.random.default_rng(1)
+    points, timestamps = gaze_session(rng, 500)
+
+    single = EventClassifier()
+    batch = EventClassifier()
+    expected = [single.classify(point, timestamp) for point, timestamp in zip(points, timestamps)]
+    first = batch.classifyBatch(points[:130], timestamps[:130])
+    second = batch.classifyBatch(points[130:], timestamps[130:])
+
+    assert np.allclose(np.concatenate((first[0], second[0])), [fixation for fixation, _ in expected])
+    assert np.array_equal(np.concatenate((first[1], second[1])), [saccade for _, saccade in expected])
+    assert 5 < sum(saccade for _, saccade in expected) < 50
+    assert np.isclose(batch.threshold, single.threshold)
+    assert batch.fixation_count == single.fixation_count
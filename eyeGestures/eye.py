@@ -1,28 +1,36 @@
 """Module providing a extraction of eye from face object."""
 
-import cv2
 import numpy as np
 import mediapipe as mp
+from eyeGestures.frame import Frame
 
 
 class Eye:
     """Class storing data related and representing a eye"""
 
-    LEFT_EYE_KEYPOINTS = np.array(
-        list(mp.solutions.face_mesh.FACEMESH_LEFT_EYE))[:, 0]
-    RIGHT_EYE_KEYPOINTS = np.array(
-        list(mp.solutions.face_mesh.FACEMESH_RIGHT_EYE))[:, 0]
+    # contour edges start twice at eye corner, keep every point once
+    LEFT_EYE_KEYPOINTS = np.array(list(dict.fromkeys(np.array(
+        list(mp.solutions.face_mesh.FACEMESH_LEFT_EYE))[:, 0])))
+    RIGHT_EYE_KEYPOINTS = np.array(list(dict.fromkeys(np.array(
+        list(mp.solutions.face_mesh.FACEMESH_RIGHT_EYE))[:, 0])))
     LEFT_EYE_IRIS_KEYPOINT = []
     RIGHT_EYE_IRIS_KEYPOINT = []
     LEFT_EYE_PUPIL_KEYPOINT = [473]
     RIGHT_EYE_PUPIL_KEYPOINT = [468]
 
+    # (region index, pupil index) of each eye inside full face mesh
+    FULL_LAYOUT = {
+        "left": (LEFT_EYE_KEYPOINTS, LEFT_EYE_PUPIL_KEYPOINT[0]),
+        "right": (RIGHT_EYE_KEYPOINTS, RIGHT_EYE_PUPIL_KEYPOINT[0]),
+    }
+
     # LEFT_EYE_KEYPOINTS = [36, 37, 38, 39, 40, 41] # keypoint indices for left eye
     # RIGHT_EYE_KEYPOINTS = [42, 43, 44, 45, 46, 47] # keypoint indices for right eye
 
     scale = (150, 100)
+    margin = 2
 
-    def __init__(self, side: int):
+    def __init__(self, side: int, images=True):
 
         # check if eye is left or right
         if side == 1:
@@ -40,33 +48,44 @@ class Eye:
         self.center_y = 0
         self.image = None
         self.pupil = None
+        self._pupil = np.zeros(2, dtype=np.float32)
+        self._patch_buffer = np.empty((0, 0), dtype=np.uint8)
         self.offset = None
         self.region = None
         self.cut_image = None
+        self.images = images
         self.landmarks = None
 
         # self._process(self.image,self.region)
 
-    def update(self, image: np.ndarray, landmarks: list, offset: np.ndarray):
-        """function updating data stored inside eye object"""
+    def update(self, image: Frame, landmarks: np.ndarray, offset: np.ndarray, layout=None):
+        """function updating data stored inside eye object
+
+        layout maps eye side to (region index, pupil index) inside landmarks,
+        when region index is a slice region is a view on landmarks.
+        """
 
-        self.image = image
+        image = Frame.wrap(image)
+        # frame is kept only for lazy cut of eye image
+        self.image = image if self.images else None
+        self.cut_image = None
         self.offset = offset
         self.landmarks = landmarks
 
-        # check if eye is left or right
-        if self.side == "right":
-            self.region = np.array(
-                landmarks[self.RIGHT_EYE_KEYPOINTS])
-                # landmarks[self.RIGHT_EYE_KEYPOINTS], dtype=np.int32)
+        if layout is None:
+            layout = self.FULL_LAYOUT
 
-        elif self.side == "left":
-            self.region = np.array(
-                landmarks[self.LEFT_EYE_KEYPOINTS])
-                # landmarks[self.LEFT_EYE_KEYPOINTS], dtype=np.int32)
+        # check if eye is left or right, on mirrored frame mesh eyes swap sides
+        side = self.side
+        if image.mirrored:
+            side = "left" if self.side == "right" else "right"
 
-        self.pupil = landmarks[self.pupil_index][0]
-        self._process(self.image, self.region)
+        region_index, self.pupil_index = layout[side]
+        self.region = landmarks[region_index]
+        # pupil is adjusted in _process, so it is kept in own buffer
+        self.pupil = self._pupil
+        self.pupil[:] = landmarks[self.pupil_index]
+        self._process(self.region)
 
     def getCenter(self):
         """function returning center of eye"""
@@ -90,9 +109,16 @@ class Eye:
         return (self.height) <= 3  # 2x margin
 
     def getImage(self):
-        """function returning image of the eye cut from the entire face image"""
+        """function returning image of the eye cut from the entire face image
+
+        image is cut on first call after update, None when images are disabled
+        """
 
         # TODO: draw additional parameters
+        if self.cut_image is None and self.image is not None:
+            self.cut_image = self._patch(self.image, self.x, self.y,
+                                         self.width + 2 * self.margin,
+                                         self.height + 2 * self.margin)
         return self.cut_image
 
     def getGaze(self, gaze_buffor, y_correction=0, x_correction=0):
@@ -130,19 +156,26 @@ class Eye:
     def getBoundingBox(self):
         return (self.x,self.y,self.width,self.height)
 
-    def _process(self, image, region):
-        h, w, _ = image.shape
+    def _patch(self, image: Frame, x, y, width, height):
+        """function cutting grayscale eye patch into buffer reused across frames"""
 
-        mask = np.full((h, w), 0, dtype=np.uint8)
-        background = np.zeros((h, w), dtype=np.uint8)
+        # crop first, grayscale frame is shared by both eyes
+        crop = image.crop(x, y, width, height, "GRAY")
 
-        region_int = np.array(region,dtype=np.int32)
-        cv2.fillPoly(mask, [region_int], 0)
+        h, w = crop.shape
+        if self._patch_buffer.shape[0] < h or self._patch_buffer.shape[1] < w:
+            self._patch_buffer = np.empty(
+                (max(h, self._patch_buffer.shape[0]) * 2, max(w, self._patch_buffer.shape[1]) * 2),
+                dtype=np.uint8)
 
-        masked_image = cv2.bitwise_not(background, cv2.cvtColor(
-            image.copy(), cv2.COLOR_BGR2GRAY), mask=mask)
+        patch = self._patch_buffer[:h, :w]
+        np.copyto(patch, crop)
+        return patch
+
+    def _process(self, region):
+        region_int = np.array(region,dtype=np.int32)
 
-        margin = 2
+        margin = self.margin
         min_x = np.min(region_int[:, 0]) - margin
         max_x = np.max(region_int[:, 0]) + margin
         min_y = np.min(region_int[:, 1]) - margin
@@ -160,7 +193,6 @@ class Eye:
         # HACKETY_HACK:
         self.pupil[1] = np.min(region[:, 1])
 
-        self.cut_image = masked_image[min_y:max_y, min_x:max_x]
         # print(f"here: {self.cut_image.shape,min_y,max_y,min_x,max_x}")
         # self.cut_image = cv2.cvtColor(self.cut_image, cv2.COLOR_GRAY2BGR)
 
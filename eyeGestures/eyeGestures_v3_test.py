@@ -0,0 +1,198 @@
+import cv2
+import pickle
+import pytest
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from eyeGestures import EyeGestures_v3
+from eyeGestures.calibration_v2 import Calibrator
+from eyeGestures.gevent import NoFace
+from eyeGestures.landmarkBackends import LandmarkBackend
+
+
+def recorded_frames(image, rng, n_frames):
+    # face drifting slowly with occasional jumps, so fixations and saccades both occur
+    steps = rng.normal(0, 0.5, (n_frames, 2))
+    steps[rng.random(n_frames) < 0.1] *= 30
+    shifts = np.clip(np.cumsum(steps, axis=0), -60, 60)
+    frames = [cv2.warpAffine(image, np.float32([[1, 0, dx], [0, 1, dy]]), image.shape[1::-1],
+                             borderMode=cv2.BORDER_REPLICATE) for dx, dy in shifts]
+    timestamps = 100.0 + np.cumsum(rng.uniform(0.025, 0.04, n_frames))
+    return frames, timestamps
+
+
+def test_predict_batch_matches_predict(fitted_calibrator):
+    key_points = np.random.default_rng(0).uniform(0, 100, (50, 32, 2))
+
+    expected = np.array([fitted_calibrator.predict(frame_key_points) for frame_key_points in key_points])
+
+    assert np.allclose(fitted_calibrator.predictBatch(key_points), expected)
+    assert np.array_equal(Calibrator().predictBatch(key_points), np.zeros((50, 2)))
+
+
+def test_step_batch_matches_step(face_images, fitted_calibrator):
+    frames, timestamps = recorded_frames(face_images["face_1"], np.random.default_rng(2), 60)
+
+    # key points of frames as getLandmarks of fresh tracker builds them
+    extracting = EyeGestures_v3()
+    key_points = np.array([extracting.getLandmarks(frame)[0] for frame in frames])
+
+    # averaged gaze of session is slow, so floor of saccade threshold is lowered
+    stepped = EyeGestures_v3(saccade_min_velocity=100)
+    batched = EyeGestures_v3(saccade_min_velocity=100)
+    for gestures in (stepped, batched):
+        gestures.addContext("main").clb = fitted_calibrator
+
+    # first frames are stepped before fit is known, to cover empty averaging window
+    unfitted = EyeGestures_v3()
+    assert np.array_equal(unfitted.stepBatch(key_points[:5], timestamps[:5])[0], np.zeros((5, 2)))
+
+    points, fixations, saccades = [], [], []
+    for frame, timestamp in zip(frames, timestamps):
+        gevent, _ = stepped.step(frame, False, 1920, 1080, timestamp=timestamp)
+        points.append(gevent.point)
+        fixations.append(gevent.fixation)
+        saccades.append(gevent.saccades)
+
+    first = batched.stepBatch(key_points[:25], timestamps[:25])
+    second = batched.stepBatch(key_points[25:], timestamps[25:])
+
+    assert np.allclose(np.concatenate((first[0], second[0])), points)
+    assert np.allclose(np.concatenate((first[1], second[1])), fixations)
+    assert np.array_equal(np.concatenate((first[2], second[2])), saccades)
+    assert any(saccades) and not all(saccades)
+    assert batched.contexts["main"].filled_points == stepped.contexts["main"].filled_points
+    assert np.allclose(batched.contexts["main"].average_points.getSum(),
+                       stepped.contexts["main"].average_points.getSum())
+
+
+def test_contexts_step_concurrently_in_isolation(face_images):
+    shared = EyeGestures_v3()
+    with ThreadPoolExecutor(4) as pool:
+        for _ in range(3):
+            list(pool.map(lambda name: shared.step(face_images[name], False, 1920, 1080, context=name), face_images))
+
+    for name, image in face_images.items():
+        alone = EyeGestures_v3()
+        for _ in range(3):
+            alone.step(image, False, 1920, 1080, context=name)
+
+        assert np.array_equal(shared.contexts[name].starting_head_position,
+                              alone.contexts[name].starting_head_position)
+        assert np.allclose(shared.contexts[name].key_points_buffer.getLatest(),
+                           alone.contexts[name].key_points_buffer.getLatest())
+    assert shared.getFinder("face_1") is not shared.getFinder("face_2")
+    assert shared.getInferenceStats("face_1")["frames"] == {1.0: 3}
+
+
+def test_frames_without_face_give_no_face(face_images):
+    image = face_images["face_1"]
+    blank = np.zeros_like(image)
+
+    gestures = EyeGestures_v3(keyframe_interval=4)
+    for _ in range(3):
+        result = gestures.step(blank, False, 1920, 1080)
+    gevent, cevent = result
+    assert isinstance(result, NoFace)
+    assert gevent is None and cevent is None
+    assert (result.frames, result.streak) == (3, 3)
+    assert gestures.contexts["main"].face.landmarks is None
+
+    gevent, _ = gestures.step(image, False, 1920, 1080)
+    assert gevent is not None
+    assert gestures.getNoFaceStats() == {"frames": 3, "streak": 0}
+
+
+def test_step_raises_errors(face_images):
+    image = face_images["face_1"]
+    gestures = EyeGestures_v3()
+    # calibrator fitted on key points of different size cannot predict
+    calibrator = gestures.addContext("main").clb
+    calibrator.add(np.zeros(3), (0.0, 0.0))
+    calibrator.waitFit()
+
+    with pytest.raises(ValueError):
+        gestures.step(image, False, 1920, 1080)
+
+
+def test_gevents_carry_capture_time_and_sequence(face_images):
+    image = face_images["face_1"]
+    gestures = EyeGestures_v3()
+
+    gevent, _ = gestures.step(image, False, 1920, 1080, timestamp=100.0, sequence=7)
+    assert (gevent.timestamp, gevent.sequence) == (100.0, 7)
+    assert gevent.processed > gevent.timestamp and gevent.latency == gevent.processed - 100.0
+    # sub frame of mirrored camera frame can be drawn on
+    cv2.rectangle(gevent.sub_frame, (0, 0), (5, 5), (255, 0, 0), 1)
+
+    no_face = gestures.step(np.zeros_like(image), False, 1920, 1080, timestamp=100.1)
+    assert (no_face.timestamp, no_face.sequence) == (100.1, 8)
+
+    gevent, _ = gestures.step(image, False, 1920, 1080)
+    assert gevent.sequence == 9
+    assert 0.0 <= gevent.latency < 10.0
+
+
+class FailingBackend(LandmarkBackend):
+
+    def process(self, image):
+        raise RuntimeError("model crashed")
+
+
+def test_backend_errors_are_not_counted_as_no_face(face_images):
+    image = face_images["face_1"]
+    gestures = EyeGestures_v3(backend=FailingBackend())
+
+    with pytest.raises(RuntimeError, match="model crashed"):
+        gestures.step(image, False, 1920, 1080)
+    assert gestures.getNoFaceStats() == {"frames": 0, "streak": 0}
+
+
+def two_faces_frame(face_images):
+    faces = [face_images["face_1"], face_images["face_2"]]
+    height = max(face.shape[0] for face in faces)
+    return np.hstack([cv2.copyMakeBorder(face, 0, height - face.shape[0], 0, 0, cv2.BORDER_CONSTANT)
+                      for face in faces])
+
+
+def test_step_faces_keeps_context_per_identity(face_images):
+    frame = two_faces_frame(face_images)
+    gestures = EyeGestures_v3(max_num_faces=2, face_max_missing=5)
+
+    for _ in range(3):
+        events = gestures.stepFaces(frame, False, 1920, 1080)
+        assert sorted(events) == [0, 1]
+        assert all(gevent.context == gestures.faceContext(identity) for identity, (gevent, _) in events.items())
+    # faces share one inference per frame of camera context
+    assert gestures.getInferenceStats("main")["frames"] == {1.0: 3}
+    assert gestures.contexts["main_0"].face is not gestures.contexts["main_1"].face
+
+    calibrator = gestures.contexts["main_0"].clb
+    for _ in range(6):
+        assert gestures.stepFaces(np.zeros_like(frame), False, 1920, 1080) == {}
+    assert sorted(gestures.lostFaces()) == [0, 1]
+    assert gestures.contexts["main_0"].clb is calibrator and "main_1" in gestures.contexts
+
+
+def test_step_faces_removes_lost_contexts_when_enabled(face_images):
+    frame = two_faces_frame(face_images)
+    gestures = EyeGestures_v3(max_num_faces=2, face_max_missing=2, remove_lost_faces=True)
+
+    gestures.stepFaces(frame, False, 1920, 1080)
+    for _ in range(3):
+        gestures.stepFaces(np.zeros_like(frame), False, 1920, 1080)
+    assert "main_0" not in gestures.contexts and "main_1" not in gestures.contexts
+
+
+def test_load_model_rejects_other_key_points(face_images, fitted_calibrator):
+    gestures = EyeGestures_v3()
+    gestures.loadModel(pickle.dumps(fitted_calibrator))
+    gevent, _ = gestures.step(face_images["face_1"], False, 1920, 1080)
+    assert gevent.point.any()
+    assert gestures.contexts["main"].clb.getFeatureCount() == 2 * EyeGestures_v3.KEY_POINTS
+
+    # model of build with 16 key points per eye
+    outdated = Calibrator()
+    outdated.add(np.zeros((34, 2)), (0.0, 0.0))
+    with pytest.raises(ValueError, match="calibrate again"):
+        gestures.loadModel(pickle.dumps(outdated))
+    assert gestures.contexts["main"].clb.getFeatureCount() == 64
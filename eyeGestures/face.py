@@ -1,44 +1,206 @@
 """Module providing finding and extraction of face from image."""
 
+import time
+
 import cv2
 import numpy as np
 import mediapipe as mp
 import eyeGestures.eye as eye
+from eyeGestures.frame import Frame
+from eyeGestures.landmarkBackends import MediaPipeBackend
 
 
 class FaceFinder:
+    """Class finding face landmarks on frames with landmark backend (mediapipe face mesh by default).
 
-    def __init__(self):
-        self.mp_face_mesh = mp.solutions.face_mesh.FaceMesh(
-            refine_landmarks=True,
-            static_image_mode=False,
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
+    find returns float32 array (n_faces, 478, 2) of landmarks normalized to
+    region used for inference or None. In tracking mode inference runs on
+    padded crop around face box from previous frame, downscaled to roi_size,
+    and falls back to full frame detection when face is lost. Region used for
+    last inference is kept in `roi` (pixel coordinates, None for full frame).
 
-    def find(self, image):
+    In adaptive mode full frame inference runs on frame downscaled so that
+    face box from previous frame keeps about target_face_size pixels, large
+    (close) faces are downscaled and small (distant) ones stay at full
+    resolution. Scale is quantized to scale_step and landmarks are normalized,
+    so they need no rescaling. Chosen scale and inference latency per scale
+    are reported by getStats.
+    """
 
-        assert (len(image.shape) > 2)
+    def __init__(self, tracking=False, roi_margin=0.25, roi_size=256, max_num_faces=1, backend=None,
+                 adaptive=False, target_face_size=192, min_scale=0.25, scale_step=0.125):
+        if backend is None:
+            backend = MediaPipeBackend(max_num_faces=max_num_faces)
+        self.backend = backend
+
+        # roi tracking follows single face, it is not used for multiple faces
+        self.max_num_faces = max_num_faces
+        self.tracking = tracking and max_num_faces == 1
+        self.roi_margin = roi_margin
+        self.roi_size = roi_size
+        self.roi = None
+        self.roi_backend = None
+
+        self.adaptive = adaptive
+        self.target_face_size = target_face_size
+        self.min_scale = min_scale
+        self.scale_step = scale_step
+        self.scale = 1.0
+        # scale -> [frames, seconds] of full frame inference, roi inference kept apart
+        self.__latency = dict()
+        self.__roi_latency = [0, 0.0]
+
+    def __inferenceScale(self, box):
+        if not self.adaptive or box is None or box[2] <= 0 or box[3] <= 0:
+            return 1.0
+
+        scale = self.target_face_size / max(box[2], box[3])
+        # rounding up keeps face at least target_face_size pixels
+        scale = np.ceil(scale / self.scale_step) * self.scale_step
+        return float(min(max(scale, self.min_scale), 1.0))
+
+    def __findInFrame(self, image, scale):
+        if scale >= 1.0:
+            return self.backend.process(image.getRGB())
 
-        try:
-            face_mesh = self.mp_face_mesh.process(
-                cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+        # resizing before conversion converts only downscaled pixels, area
+        # interpolation is fast only for integer factors
+        interpolation = cv2.INTER_AREA if (1.0 / scale).is_integer() else cv2.INTER_LINEAR
+        pixels = cv2.resize(image.image, (max(int(image.width * scale), 1), max(int(image.height * scale), 1)),
+                            interpolation=interpolation)
+        if image.color != "RGB":
+            pixels = cv2.cvtColor(pixels, Frame.CONVERSIONS[(image.color, "RGB")])
+        return self.backend.process(pixels)
 
-            if face_mesh.multi_face_landmarks is None:
-                return None
+    def __findInRoi(self, image, box):
+        # crops move with the face, so stateful backends get separate instance
+        # to keep internal tracking of full frame one consistent
+        if self.roi_backend is None:
+            self.roi_backend = self.backend.fork()
 
-            return face_mesh
-        except Exception as e:
-            print(f"Exception in FaceFinder: {e}")
+        x, y, width, height = box
+        side = max(width, height) * (1.0 + 2 * self.roi_margin)
+        x, y, width, height = image.region(
+            x + width / 2 - side / 2, y + height / 2 - side / 2, side, side)
+        if width == 0 or height == 0:
             return None
 
+        crop = image.image[y:y + height, x:x + width]
+        scale = min(1.0, self.roi_size / max(width, height))
+        if scale < 1.0:
+            crop = cv2.resize(crop, (max(int(width * scale), 1), max(int(height * scale), 1)),
+                              interpolation=cv2.INTER_AREA)
+        if image.color != "RGB":
+            crop = cv2.cvtColor(crop, Frame.CONVERSIONS[(image.color, "RGB")])
+
+        landmarks = self.roi_backend.process(np.ascontiguousarray(crop))
+        if landmarks is None:
+            return None
+
+        self.roi = (x, y, width, height)
+        return landmarks
+
+    def find(self, image, box=None):
+        """Function returning face landmarks, box (x, y, width, height) of face on previous frame is used in tracking mode.
+
+        None means there is no face on image, errors of backend are raised.
+        """
+
+        image = Frame.wrap(image)
+        assert (len(image.shape) > 2)
+
+        self.roi = None
+        if self.tracking and box is not None and box[2] > 0 and box[3] > 0:
+            start = time.perf_counter()
+            landmarks = self.__findInRoi(image, box)
+            if landmarks is not None:
+                self.__roi_latency[0] += 1
+                self.__roi_latency[1] += time.perf_counter() - start
+                return landmarks
+
+        start = time.perf_counter()
+        self.scale = self.__inferenceScale(box)
+        landmarks = self.__findInFrame(image, self.scale)
+        if landmarks is None and self.scale < 1.0:
+            # face may have moved away from camera, retry at full resolution
+            self.scale = 1.0
+            landmarks = self.__findInFrame(image, self.scale)
+
+        latency = self.__latency.setdefault(self.scale, [0, 0.0])
+        latency[0] += 1
+        latency[1] += time.perf_counter() - start
+        return landmarks
+
+    def getStats(self):
+        """Function returning last full frame inference scale and mean inference latency (ms).
+
+        latency maps full frame inference scale to mean latency, roi_latency
+        is mean latency of tracked roi inference (None before first one).
+        """
+
+        roi_frames, roi_seconds = self.__roi_latency
+        return {
+            "scale": self.scale,
+            "latency": {scale: seconds / frames * 1e3
+                        for scale, (frames, seconds) in sorted(self.__latency.items())},
+            "frames": {scale: frames for scale, (frames, _) in sorted(self.__latency.items())},
+            "roi_latency": roi_seconds / roi_frames * 1e3 if roi_frames > 0 else None,
+            "roi_frames": roi_frames,
+        }
+
 
 class Face:
 
-    def __init__(self):
-        self.eyeLeft = eye.Eye(0)
-        self.eyeRight = eye.Eye(1)
+    FACE_OVAL_KEYPOINTS = np.array(
+        list(mp.solutions.face_mesh.FACEMESH_FACE_OVAL))[:, 0]
+
+    # landmarks used by trackers: both eyes with pupils and face oval giving
+    # face extent, gathered into one contiguous array with each eye as a slice
+    SUBSET_KEYPOINTS = np.concatenate((
+        eye.Eye.LEFT_EYE_KEYPOINTS, eye.Eye.LEFT_EYE_PUPIL_KEYPOINT,
+        eye.Eye.RIGHT_EYE_KEYPOINTS, eye.Eye.RIGHT_EYE_PUPIL_KEYPOINT,
+        FACE_OVAL_KEYPOINTS))
+    assert len(set(SUBSET_KEYPOINTS)) == len(SUBSET_KEYPOINTS)
+
+    SUBSET_LAYOUT = {
+        "left": (slice(0, len(eye.Eye.LEFT_EYE_KEYPOINTS)),
+                 len(eye.Eye.LEFT_EYE_KEYPOINTS)),
+        "right": (slice(len(eye.Eye.LEFT_EYE_KEYPOINTS) + 1,
+                        len(eye.Eye.LEFT_EYE_KEYPOINTS) + 1 + len(eye.Eye.RIGHT_EYE_KEYPOINTS)),
+                  len(eye.Eye.LEFT_EYE_KEYPOINTS) + 1 + len(eye.Eye.RIGHT_EYE_KEYPOINTS)),
+    }
+
+    # eyes with pupils, moved by optical flow between face mesh keyframes
+    FLOW_KEYPOINTS = slice(0, SUBSET_LAYOUT["right"][1] + 1)
+    FLOW_MARGIN = 10
+    FLOW_MAX_ERROR = 1.0
+
+    def __init__(self, full_mesh=False, images=True, propagation=False):
+        self.eyeLeft = eye.Eye(0, images)
+        self.eyeRight = eye.Eye(1, images)
+        self.landmarks = None
+        self.image_w = 0
+        self.image_h = 0
+        self.full_mesh = full_mesh
+        # grayscale crop around eyes of previous frame is kept only when
+        # landmarks are propagated, as copy so frame buffer can be reused
+        self.propagation = propagation and not full_mesh
+        self.motion = 0.0
+        self._flow_crop = None
+        self._flow_region = None
+        self._flow_points = None
+        self._scale = np.ones(2, dtype=np.float32)
+        self._landmarks_buffer = np.zeros(
+            (478 if full_mesh else len(self.SUBSET_KEYPOINTS), 2), dtype=np.float32)
+
+    def lose(self):
+        """Function forgetting landmarks after frame without face, so nothing is propagated from them"""
+
         self.landmarks = None
+        self.motion = 0.0
+        self._flow_crop = None
+        self._flow_region = None
+        self._flow_points = None
 
     def getBoundingBox(self):
         if self.landmarks is not None:
@@ -64,32 +226,180 @@ class Face:
     def getLandmarks(self):
         return self.landmarks
 
-    def _landmarks(self, face):
+    def _landmarks(self, face, index=0):
+        """Function converting normalized landmarks of face at index to pixel coordinates.
 
-        __complex_landmark_points = face.multi_face_landmarks
-        __complex_landmarks = __complex_landmark_points[0].landmark
+        Unless face is created with full_mesh, only SUBSET_KEYPOINTS are
+        gathered. Landmarks are written into preallocated float32 buffer owned
+        by the face, so returned array is reused (and overwritten) on next frame.
+        """
 
-        __face_landmarks = []
-        for landmark in __complex_landmarks:
-            __face_landmarks.append((
-                landmark.x * self.image_w,
-                landmark.y * self.image_h))
+        # mediapipe results are still accepted
+        if not isinstance(face, np.ndarray):
+            face = MediaPipeBackend.toArray(face)
+        __landmarks = face[index]
 
-        return np.array(__face_landmarks)
+        if self.full_mesh:
+            if self._landmarks_buffer.shape[0] != __landmarks.shape[0]:
+                self._landmarks_buffer = np.zeros((__landmarks.shape[0], 2), dtype=np.float32)
+            np.multiply(__landmarks, self._scale, out=self._landmarks_buffer)
+        else:
+            np.take(__landmarks, self.SUBSET_KEYPOINTS, axis=0, out=self._landmarks_buffer)
+            self._landmarks_buffer *= self._scale
+        return self._landmarks_buffer
 
-    def process(self, image, face):
+    def process(self, image, face, roi=None, index=0):
+        """Function processing face at index of landmarks found by FaceFinder, roi (x, y, width, height) is region of frame they were found in"""
         # try:
+        image = Frame.wrap(image)
         self.face = face
-        self.image_h, self.image_w, _ = image.shape
-        self.landmarks = self._landmarks(self.face)
+        self.image_h, self.image_w = image.height, image.width
+        if roi is None:
+            roi = (0, 0, self.image_w, self.image_h)
+        self._scale[0] = roi[2]
+        self._scale[1] = roi[3]
+        self.landmarks = self._landmarks(self.face, index)
+        self.landmarks[:, 0] += roi[0]
+        self.landmarks[:, 1] += roi[1]
+        self.landmarks = image.mirrorPoints(self.landmarks)
         # self.nose = nose.Nose(image,self.landmarks,self.getBoundingBox())
 
+        if self.propagation:
+            self.__updateFlow(image)
+        self.__updateEyes(image)
+
+    def __updateFlow(self, image):
+        # motion of eyes since previous frame drives keyframe scheduling
+        points = self.landmarks[self.FLOW_KEYPOINTS]
+        if self._flow_points is None:
+            self._flow_points = points.copy()
+            self.motion = 0.0
+        else:
+            self.motion = float(np.median(np.linalg.norm(points - self._flow_points, axis=1)))
+            self._flow_points[:] = points
+
+        x_0 = int(max(np.min(points[:, 0]) - self.FLOW_MARGIN, 0))
+        y_0 = int(max(np.min(points[:, 1]) - self.FLOW_MARGIN, 0))
+        x_1 = int(min(np.max(points[:, 0]) + self.FLOW_MARGIN, image.width))
+        y_1 = int(min(np.max(points[:, 1]) + self.FLOW_MARGIN, image.height))
+        if x_1 <= x_0 or y_1 <= y_0:
+            self._flow_crop = None
+            return
+        # crops are in output orientation, so points only need shifting by origin
+        self._flow_region = (x_0, y_0, x_1 - x_0, y_1 - y_0, image.width, image.height)
+        self._flow_crop = np.array(image.crop(x_0, y_0, x_1 - x_0, y_1 - y_0, "GRAY"))
+
+    def propagate(self, image):
+        """Function moving eye and pupil landmarks from previous frame with pyramidal Lucas-Kanade flow.
+
+        Rest of landmarks follows median eye displacement. Returns (confidence, motion):
+        fraction of points tracked reliably and median displacement in pixels.
+        Confidence is 0 when there is nothing to propagate from.
+        """
+
+        image = Frame.wrap(image)
+        if (not self.propagation or self.landmarks is None or self._flow_crop is None
+                or self._flow_region[4:] != (image.width, image.height)):
+            return 0.0, 0.0
+
+        points = self.landmarks[self.FLOW_KEYPOINTS]
+        x_0, y_0, width, height = self._flow_region[:4]
+        prev_crop = self._flow_crop
+        next_crop = np.ascontiguousarray(image.crop(x_0, y_0, width, height, "GRAY"))
+        origin = np.array((x_0, y_0), dtype=np.float32)
+
+        prev_points = (points - origin).reshape(-1, 1, 2)
+        next_points, status, _ = cv2.calcOpticalFlowPyrLK(
+            prev_crop, next_crop, prev_points, None, winSize=(15, 15), maxLevel=2)
+        back_points, back_status, _ = cv2.calcOpticalFlowPyrLK(
+            next_crop, prev_crop, next_points, None, winSize=(15, 15), maxLevel=2)
+
+        # forward-backward check rejects points which drifted
+        error = np.linalg.norm((back_points - prev_points).reshape(-1, 2), axis=1)
+        good = (status.ravel() == 1) & (back_status.ravel() == 1) & (error < self.FLOW_MAX_ERROR)
+        if not good.any():
+            return 0.0, 0.0
+
+        displacement = (next_points - prev_points).reshape(-1, 2)
+        shift = np.median(displacement[good], axis=0)
+        motion = float(np.median(np.linalg.norm(displacement[good], axis=1)))
+        displacement[~good] = shift
+
+        self.landmarks[self.FLOW_KEYPOINTS] += displacement
+        self.landmarks[self.FLOW_KEYPOINTS.stop:] += shift
+        self.__updateFlow(image)
+        self.__updateEyes(image)
+        return float(np.mean(good)), motion
+
+    def __updateEyes(self, image):
         x, y, _, _ = self.getBoundingBox()
         offset = np.array((x, y))
         # offset = offset - self.nose.getHeadTiltOffset()
 
-        self.eyeLeft.update(image, self.landmarks, offset)
-        self.eyeRight.update(image, self.landmarks, offset)
+        layout = None if self.full_mesh else self.SUBSET_LAYOUT
+        self.eyeLeft.update(image, self.landmarks, offset, layout)
+        self.eyeRight.update(image, self.landmarks, offset, layout)
         # except Exception as e:
         #     print(f"Caught exception: {e}")
         #     return None
+
+
+class KeyframeScheduler:
+    """Class deciding which frames run full face mesh and which get propagated landmarks.
+
+    Interval between keyframes grows by one while motion stays below
+    motion_threshold (fixations) up to max_interval, and drops back to every
+    frame on faster motion (saccades). Propagation with confidence below
+    min_confidence or motion above twice the threshold is rejected and
+    frame becomes keyframe.
+    """
+
+    def __init__(self, max_interval=8, motion_threshold=1.5, min_confidence=0.8):
+        self.max_interval = max_interval
+        self.motion_threshold = motion_threshold
+        self.min_confidence = min_confidence
+
+        self.interval = 1
+        self.since_keyframe = 0
+        self.keyframes = 0
+        self.propagated = 0
+
+    def isKeyframe(self):
+        """Function returning True when next frame should run full face mesh"""
+
+        return self.since_keyframe + 1 >= self.interval
+
+    def __adapt(self, motion):
+        if motion > self.motion_threshold:
+            self.interval = 1
+        else:
+            self.interval = min(self.interval + 1, self.max_interval)
+
+    def keyframe(self, motion=0.0):
+        """Function registering frame processed with full face mesh and eye motion since previous frame"""
+
+        self.keyframes += 1
+        self.since_keyframe = 0
+        self.__adapt(motion)
+
+    def accept(self, confidence, motion):
+        """Function registering propagated frame, returns False when it has to be keyframe instead"""
+
+        if confidence < self.min_confidence or motion > 2 * self.motion_threshold:
+            self.interval = 1
+            return False
+
+        self.propagated += 1
+        self.since_keyframe += 1
+        self.__adapt(motion)
+        return True
+
+    def getStats(self):
+        """Function returning numbers of keyframes and propagated frames"""
+
+        return {
+            "keyframes": self.keyframes,
+            "propagated": self.propagated,
+            "interval": self.interval,
+        }
+
@@ -0,0 +1,107 @@
+"""Module providing association of faces found on consecutive frames with stable identities."""
+
+import numpy as np
+
+
+def boxes_iou(boxes_a, boxes_b):
+    """Function returning matrix of intersection over union between (x, y, width, height) boxes"""
+
+    boxes_a = np.asarray(boxes_a, dtype=float).reshape(-1, 4)
+    boxes_b = np.asarray(boxes_b, dtype=float).reshape(-1, 4)
+
+    a_x0, a_y0 = boxes_a[:, 0:1], boxes_a[:, 1:2]
+    a_x1, a_y1 = a_x0 + boxes_a[:, 2:3], a_y0 + boxes_a[:, 3:4]
+    b_x0, b_y0 = boxes_b[:, 0], boxes_b[:, 1]
+    b_x1, b_y1 = b_x0 + boxes_b[:, 2], b_y0 + boxes_b[:, 3]
+
+    inter_w = np.clip(np.minimum(a_x1, b_x1) - np.maximum(a_x0, b_x0), 0, None)
+    inter_h = np.clip(np.minimum(a_y1, b_y1) - np.maximum(a_y0, b_y0), 0, None)
+    intersection = inter_w * inter_h
+
+    union = boxes_a[:, 2:3] * boxes_a[:, 3:4] + boxes_b[:, 2] * boxes_b[:, 3] - intersection
+    return np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+
+
+class FaceTracker:
+    """Class assigning stable identities to face boxes across frames.
+
+    Boxes are matched greedily by IoU, boxes left over are matched by centroid
+    distance relative to face size. Identities not seen for max_missing frames
+    are dropped and reported in `lost`.
+    """
+
+    def __init__(self, iou_threshold=0.3, max_distance=0.5, max_missing=15):
+        self.iou_threshold = iou_threshold
+        self.max_distance = max_distance
+        self.max_missing = max_missing
+
+        self.next_id = 0
+        self.ids = []
+        self.boxes = np.zeros((0, 4))
+        self.missing = []
+        self.lost = []
+
+    def __match(self, score, threshold, higher_better, assigned, used):
+        order = np.argsort(-score if higher_better else score, axis=None)
+        for flat in order:
+            track, box = np.unravel_index(flat, score.shape)
+            value = score[track, box]
+            if (value < threshold) if higher_better else (value > threshold):
+                break
+            if track in used or box in assigned:
+                continue
+            assigned[box] = track
+            used.add(track)
+
+    def update(self, boxes):
+        """Function returning identity for each of (x, y, width, height) boxes"""
+
+        boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+        assigned = dict()
+        used = set()
+
+        if len(self.ids) > 0 and len(boxes) > 0:
+            self.__match(boxes_iou(self.boxes, boxes), self.iou_threshold, True, assigned, used)
+
+            track_centers = self.boxes[:, :2] + self.boxes[:, 2:] / 2
+            box_centers = boxes[:, :2] + boxes[:, 2:] / 2
+            track_size = np.maximum(np.max(self.boxes[:, 2:], axis=1), 1.0)
+            distance = np.linalg.norm(
+                track_centers[:, None, :] - box_centers[None, :, :], axis=2) / track_size[:, None]
+            self.__match(distance, self.max_distance, False, assigned, used)
+
+        ids = []
+        for n in range(len(boxes)):
+            if n in assigned:
+                ids.append(self.ids[assigned[n]])
+            else:
+                ids.append(self.next_id)
+                self.next_id += 1
+
+        # tracks which were not matched age and are dropped after max_missing frames
+        self.lost = []
+        kept_ids = list(ids)
+        kept_boxes = list(boxes)
+        kept_missing = [0] * len(ids)
+        for track, identity in enumerate(self.ids):
+            if track in used:
+                continue
+            if self.missing[track] + 1 > self.max_missing:
+                self.lost.append(identity)
+            else:
+                kept_ids.append(identity)
+                kept_boxes.append(self.boxes[track])
+                kept_missing.append(self.missing[track] + 1)
+
+        self.ids = kept_ids
+        self.boxes = np.array(kept_boxes).reshape(-1, 4)
+        self.missing = kept_missing
+        return ids
+
+    def reset(self):
+        """Function forgetting all identities"""
+
+        self.lost = list(self.ids)
+        self.ids = []
+        self.boxes = np.zeros((0, 4))
+        self.missing = []
@@ -0,0 +1,51 @@
+import numpy as np
+from eyeGestures.faceTracker import FaceTracker, boxes_iou
+
+
+def test_boxes_iou():
+    iou = boxes_iou([(0, 0, 10, 10)], [(0, 0, 10, 10), (5, 0, 10, 10), (20, 20, 5, 5)])
+
+    assert np.allclose(iou, [[1.0, 50 / 150, 0.0]])
+
+
+def test_identities_stable_when_order_changes():
+    tracker = FaceTracker()
+
+    first = tracker.update([(0, 0, 100, 100), (300, 0, 100, 100)])
+    second = tracker.update([(305, 2, 100, 100), (4, 1, 100, 100)])
+
+    assert first == [0, 1]
+    assert second == [1, 0]
+
+
+def test_fast_motion_matched_by_centroid():
+    tracker = FaceTracker()
+
+    tracker.update([(0, 0, 100, 100)])
+    ids = tracker.update([(40, 30, 60, 60)])
+
+    assert ids == [0]
+
+
+def test_new_face_gets_new_identity():
+    tracker = FaceTracker()
+
+    tracker.update([(0, 0, 100, 100)])
+    ids = tracker.update([(0, 0, 100, 100), (500, 500, 100, 100)])
+
+    assert ids == [0, 1]
+
+
+def test_identity_lost_after_max_missing():
+    tracker = FaceTracker(max_missing=2)
+
+    tracker.update([(0, 0, 100, 100)])
+    tracker.update([])
+    assert tracker.lost == []
+    assert tracker.update([(2, 0, 100, 100)]) == [0]
+
+    tracker.update([])
+    tracker.update([])
+    tracker.update([])
+    assert tracker.lost == [0]
+    assert tracker.update([(2, 0, 100, 100)]) == [1]
@@ -0,0 +1,213 @@
+import cv2
+import numpy as np
+import pytest
+from eyeGestures.face import FaceFinder, Face, KeyframeScheduler
+from eyeGestures.frame import Frame
+from eyeGestures.landmarkBackends import MediaPipeBackend
+
+
+def mediapipe_result(image):
+    return MediaPipeBackend().mp_face_mesh.process(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+
+
+def legacy_landmarks(face_mesh, image_w, image_h):
+    return np.array([(landmark.x * image_w, landmark.y * image_h)
+                     for landmark in face_mesh.multi_face_landmarks[0].landmark])
+
+
+@pytest.mark.parametrize("name", ["face_1", "face_2"])
+def test_landmarks_match_legacy(name, face_images):
+    image = face_images[name]
+    face_mesh = mediapipe_result(image)
+    assert face_mesh.multi_face_landmarks is not None
+
+    face = Face(full_mesh=True)
+    face.process(image, face_mesh)
+
+    reference = legacy_landmarks(face_mesh, image.shape[1], image.shape[0])
+    assert face.getLandmarks().shape == (478, 2)
+    assert face.getLandmarks().dtype == np.float32
+    assert np.allclose(face.getLandmarks(), reference, atol=1e-3)
+
+
+def test_landmarks_buffer_reused(face_images):
+    image = face_images["face_1"]
+    face_mesh = FaceFinder().find(image)
+
+    face = Face()
+    face.process(image, face_mesh)
+    first = face.getLandmarks()
+    face.process(image, face_mesh)
+
+    assert face.getLandmarks() is first
+
+
+def test_landmarks_fallback_with_optional_fields(face_images):
+    image = face_images["face_2"]
+    face_mesh = mediapipe_result(image)
+    face_mesh.multi_face_landmarks[0].landmark[0].visibility = 1.0
+
+    reference = legacy_landmarks(face_mesh, image.shape[1], image.shape[0])
+    for face in (Face(full_mesh=True), Face()):
+        face.process(image, face_mesh)
+        index = slice(None) if face.full_mesh else Face.SUBSET_KEYPOINTS
+        assert np.allclose(face.getLandmarks(), reference[index], atol=1e-3)
+
+
+def test_subset_views_match_full_mesh(face_images):
+    image = face_images["face_1"]
+    face_mesh = FaceFinder().find(image)
+
+    full = Face(full_mesh=True)
+    full.process(image, face_mesh)
+    face = Face()
+    face.process(image, face_mesh)
+
+    for eye, full_eye in ((face.getLeftEye(), full.getLeftEye()),
+                          (face.getRightEye(), full.getRightEye())):
+        assert np.shares_memory(eye.getLandmarks(), face.getLandmarks())
+        assert np.allclose(eye.getLandmarks(), full_eye.getLandmarks())
+        assert np.allclose(eye.getPupil(), full_eye.getPupil())
+    assert face.getBoundingBox() == full.getBoundingBox()
+
+
+def test_tracking_maps_landmarks_to_frame(face_images):
+    image = face_images["face_1"]
+
+    full = Face()
+    full.process(image, FaceFinder().find(image))
+
+    finder = FaceFinder(tracking=True, roi_size=128)
+    face = Face()
+    face_mesh = finder.find(image, full.getBoundingBox())
+    face.process(image, face_mesh, finder.roi)
+
+    assert finder.roi is not None
+    assert np.mean(np.linalg.norm(face.getLandmarks() - full.getLandmarks(), axis=1)) < 5.0
+
+
+def test_tracking_falls_back_to_full_frame(face_images):
+    image = face_images["face_1"]
+
+    finder = FaceFinder(tracking=True)
+    face_mesh = finder.find(image, (0, 0, 20, 20))
+
+    assert face_mesh is not None
+    assert finder.roi is None
+
+
+def test_adaptive_scale_downscales_large_face(face_images):
+    image = face_images["face_1"]
+
+    full = Face()
+    full.process(image, FaceFinder().find(image))
+    box = full.getBoundingBox()
+
+    finder = FaceFinder(adaptive=True, target_face_size=max(box[2], box[3]) // 2)
+    face = Face()
+    face.process(image, finder.find(image, box))
+    stats = finder.getStats()
+
+    assert finder.scale < 1.0
+    assert stats["scale"] == finder.scale
+    assert stats["frames"] == {finder.scale: 1}
+    assert stats["latency"][finder.scale] > 0
+    assert np.mean(np.linalg.norm(face.getLandmarks() - full.getLandmarks(), axis=1)) < 5.0
+
+
+def test_adaptive_scale_keeps_small_face_at_full_resolution(face_images):
+    image = face_images["face_1"]
+
+    finder = FaceFinder(adaptive=True)
+    finder.find(image, (0, 0, 100, 100))
+    assert finder.scale == 1.0
+    finder.find(image)
+    assert finder.getStats()["frames"] == {1.0: 2}
+
+
+def test_eye_patch_cut_from_gray_frame(face_images):
+    image = face_images["face_2"]
+    face_mesh = FaceFinder().find(image)
+
+    face = Face()
+    face.process(image, face_mesh)
+    eye = face.getLeftEye()
+    patch = eye.getImage()
+
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    x, y = eye.getPos()
+    assert np.array_equal(patch, gray[y:y + patch.shape[0], x:x + patch.shape[1]])
+
+    face.process(image, face_mesh)
+    assert np.shares_memory(eye.getImage(), patch)
+
+
+def test_eye_images_disabled(face_images):
+    image = face_images["face_2"]
+    face_mesh = FaceFinder().find(image)
+
+    face = Face(images=False)
+    face.process(image, face_mesh)
+
+    assert face.getLeftEye().getImage() is None
+    assert face.getLeftEye().image is None
+
+
+def test_propagate_follows_shifted_frame(face_images):
+    image = face_images["face_1"]
+    face_mesh = FaceFinder().find(image)
+
+    face = Face(propagation=True)
+    face.process(Frame(image, mirrored=True), face_mesh)
+    before = face.getLandmarks().copy()
+
+    shifted = np.roll(image, 3, axis=0)
+    confidence, motion = face.propagate(Frame(shifted, mirrored=True))
+
+    assert confidence > 0.8
+    assert abs(motion - 3.0) < 0.5
+    assert np.allclose(np.median(face.getLandmarks() - before, axis=0), (0.0, 3.0), atol=0.5)
+
+
+def test_propagate_with_reused_frame_buffer(face_images):
+    image = face_images["face_1"]
+    face_mesh = FaceFinder().find(image)
+    buffer = image.copy()
+
+    face = Face(propagation=True)
+    face.process(Frame(buffer, mirrored=True), face_mesh)
+    before = face.getLandmarks().copy()
+
+    # capture writes next frame into the same buffer
+    buffer[...] = np.roll(image, 3, axis=0)
+    confidence, motion = face.propagate(Frame(buffer, mirrored=True))
+
+    assert confidence > 0.8
+    assert abs(motion - 3.0) < 0.5
+    assert np.allclose(np.median(face.getLandmarks() - before, axis=0), (0.0, 3.0), atol=0.5)
+    assert not np.shares_memory(face._flow_crop, buffer)
+
+
+def test_propagate_without_keyframe(face_images):
+    image = face_images["face_1"]
+
+    assert Face(propagation=True).propagate(image) == (0.0, 0.0)
+
+
+def test_keyframe_scheduler_adapts_to_motion():
+    scheduler = KeyframeScheduler(max_interval=4, motion_threshold=1.5)
+
+    kinds = []
+    for _ in range(10):
+        if scheduler.isKeyframe():
+            scheduler.keyframe(0.1)
+            kinds.append("K")
+        else:
+            assert scheduler.accept(1.0, 0.1)
+            kinds.append("p")
+    assert "".join(kinds) == "KpppKpppKp"
+
+    assert not scheduler.accept(1.0, 5.0)
+    assert scheduler.isKeyframe()
+    assert not scheduler.accept(0.5, 0.1)
+    assert scheduler.getStats()["propagated"] == 7
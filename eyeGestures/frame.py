@@ -0,0 +1,102 @@
+"""Module providing a frame wrapper carrying pixel format through processing."""
+
+import cv2
+import numpy as np
+
+
+class Frame:
+    """Class wrapping camera image together with its color order and mirroring state.
+
+    Color conversions are computed at most once per frame and cached. Mirroring
+    is never applied to pixels, only to coordinates (mirrorPoints) and to
+    regions cut from the frame (crop), which are flipped after cropping.
+    """
+
+    CONVERSIONS = {
+        ("BGR", "RGB"): cv2.COLOR_BGR2RGB,
+        ("RGB", "BGR"): cv2.COLOR_RGB2BGR,
+        ("BGR", "GRAY"): cv2.COLOR_BGR2GRAY,
+        ("RGB", "GRAY"): cv2.COLOR_RGB2GRAY,
+        ("GRAY", "RGB"): cv2.COLOR_GRAY2RGB,
+        ("GRAY", "BGR"): cv2.COLOR_GRAY2BGR,
+    }
+
+    def __init__(self, image: np.ndarray, color="BGR", mirrored=False):
+        self.image = image
+        self.color = color
+        self.mirrored = mirrored
+        self.shape = image.shape
+        self.height, self.width = image.shape[:2]
+
+        self.__converted = {color: image}
+
+    @staticmethod
+    def wrap(image, color="BGR", mirrored=False):
+        """Function returning frame for image, frames are passed through unchanged"""
+
+        if isinstance(image, Frame):
+            return image
+        return Frame(image, color, mirrored)
+
+    def get(self, color):
+        """Function returning frame pixels in requested color order, converting only once"""
+
+        if color not in self.__converted:
+            self.__converted[color] = cv2.cvtColor(
+                self.image, self.CONVERSIONS[(self.color, color)])
+        return self.__converted[color]
+
+    def getRGB(self):
+        """Function returning RGB pixels of the frame"""
+
+        return self.get("RGB")
+
+    def getGray(self):
+        """Function returning grayscale pixels of the frame"""
+
+        return self.get("GRAY")
+
+    def mirrorPoints(self, points: np.ndarray):
+        """Function mapping x coordinates of points between pixel and output space (in place)"""
+
+        if self.mirrored:
+            np.subtract(self.width, points[:, 0], out=points[:, 0])
+        return points
+
+    def region(self, x, y, width, height):
+        """Function mapping region given in output coordinates to pixel coordinates.
+
+        Returns (x, y, width, height) clipped to the frame.
+        """
+
+        if self.mirrored:
+            x = self.width - (x + width)
+
+        x_0 = min(max(int(x), 0), self.width)
+        y_0 = min(max(int(y), 0), self.height)
+        x_1 = min(max(int(x + width), x_0), self.width)
+        y_1 = min(max(int(y + height), y_0), self.height)
+
+        return (x_0, y_0, x_1 - x_0, y_1 - y_0)
+
+    def crop(self, x, y, width, height, color=None):
+        """Function returning region given in output coordinates, oriented as output.
+
+        Returned region is clipped to the frame. When color conversion of
+        entire frame is not cached only the region is converted, otherwise
+        region of not mirrored frame is a view on frame pixels. Region of
+        mirrored frame is flipped into contiguous copy, so it can be drawn on
+        with OpenCV.
+        """
+
+        x, y, width, height = self.region(x, y, width, height)
+
+        if color is None or color in self.__converted:
+            image = self.image if color is None else self.__converted[color]
+            region = image[y:y + height, x:x + width]
+        else:
+            region = cv2.cvtColor(self.image[y:y + height, x:x + width],
+                                  self.CONVERSIONS[(self.color, color)])
+        if self.mirrored and region.size > 0:
+            region = cv2.flip(region, 1)
+        return region
@@ -0,0 +1,65 @@
+import cv2
+import numpy as np
+from eyeGestures.frame import Frame
+
+
+def make_image():
+    return np.random.RandomState(0).randint(0, 255, (48, 64, 3), dtype=np.uint8)
+
+
+def test_conversion_cached():
+    frame = Frame(make_image(), "BGR")
+
+    rgb = frame.getRGB()
+    assert frame.getRGB() is rgb
+    assert np.array_equal(rgb, cv2.cvtColor(frame.image, cv2.COLOR_BGR2RGB))
+    assert frame.get("BGR") is frame.image
+
+
+def test_wrap_passes_frame_through():
+    frame = Frame(make_image(), "RGB", mirrored=True)
+
+    assert Frame.wrap(frame) is frame
+    assert Frame.wrap(frame.image).color == "BGR"
+
+
+def test_mirror_points():
+    frame = Frame(make_image(), mirrored=True)
+    points = np.array([[10.0, 5.0], [60.0, 7.0]])
+
+    frame.mirrorPoints(points)
+
+    assert np.array_equal(points, [[54.0, 5.0], [4.0, 7.0]])
+
+
+def test_crop_mirrored_matches_flipped_image():
+    image = make_image()
+    frame = Frame(image, "BGR", mirrored=True)
+
+    flipped = cv2.flip(cv2.cvtColor(image, cv2.COLOR_BGR2RGB), 1)
+
+    assert np.array_equal(frame.crop(5, 10, 20, 15, "RGB"), flipped[10:25, 5:25])
+
+
+def test_crop_clipped_to_frame():
+    frame = Frame(make_image())
+
+    assert frame.crop(-5, -5, 10, 10).shape == (5, 5, 3)
+    assert frame.crop(60, 40, 10, 10).shape == (8, 4, 3)
+
+
+def test_crop_converts_region_only_when_not_cached():
+    image = make_image()
+    frame = Frame(image, "BGR", mirrored=True)
+
+    region = frame.crop(5, 10, 20, 15, "GRAY")
+    assert np.array_equal(region, frame.getGray()[10:25, 39:59][:, ::-1])
+
+
+def test_crop_mirrored_can_be_drawn_on():
+    frame = Frame(make_image(), "BGR", mirrored=True)
+
+    region = frame.crop(5, 10, 20, 15)
+    assert region.flags.c_contiguous
+    cv2.rectangle(region, (0, 0), (5, 5), (255, 0, 0), 1)
+    assert not np.shares_memory(region, frame.image)
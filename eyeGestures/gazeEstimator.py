@@ -7,6 +7,7 @@ from eyeGestures.gazeContexter import GazeContext
 from eyeGestures.screenTracker.screenTracker import ScreenManager
 import eyeGestures.screenTracker.dataPoints as dp
 from eyeGestures.utils import Buffor
+from eyeGestures.frame import Frame
 
 
 def isInside(circle_x, circle_y, r, x, y):
@@ -111,12 +112,13 @@ class GazeTracker:
         """Function estimating gaze and returning gaze event based on image"""
 
         event = None
+        # wrapping once lets finder and eyes share color conversions
+        image = Frame.wrap(image)
         face_mesh = self.getFeatures(image)
-        if not face_mesh:
+        if face_mesh is None:
             return None
 
-        if face_mesh.multi_face_landmarks:
-            self.face.process(image, face_mesh)
+        self.face.process(image, face_mesh)
 
         context = self.GContext.get(
             context_id,
@@ -2,7 +2,13 @@
 
 
 class Gevent:
-    """Class representing gaze event, with tracked points scaled to screen, blink and fixation."""
+    """Class representing gaze event, with tracked points scaled to screen, blink and fixation.
+
+    timestamp is capture time of frame, processed is time when event was
+    ready (both time.monotonic seconds) and sequence is number of frame in
+    its stream, gaps in sequence are dropped frames. sub_frame can be passed
+    as function, it is called on first access.
+    """
 
     def __init__(self,
                  point,
@@ -16,7 +22,10 @@ class Gevent:
                  cluster = None,
                  context = None,
                  saccades = False,
-                 sub_frame = None):
+                 sub_frame = None,
+                 timestamp = None,
+                 processed = None,
+                 sequence = None):
 
         self.point = point
         self.blink = blink
@@ -33,6 +42,46 @@ class Gevent:
         self.screen_man = screen_man
         self.sub_frame = sub_frame
 
+        self.timestamp = timestamp
+        self.processed = processed
+        self.sequence = sequence
+
+    @property
+    def latency(self):
+        """Time from capture of frame to event in seconds, None when times are unknown"""
+        if self.timestamp is None or self.processed is None:
+            return None
+        return self.processed - self.timestamp
+
+    @property
+    def sub_frame(self):
+        if callable(self.__sub_frame):
+            self.__sub_frame = self.__sub_frame()
+        return self.__sub_frame
+
+    @sub_frame.setter
+    def sub_frame(self, sub_frame):
+        self.__sub_frame = sub_frame
+
+
+class NoFace(tuple):
+    """Class representing result of step for frame without face.
+
+    It unpacks as (None, None) like result of failed step, so
+    `gevent, cevent = step(...)` keeps working, and carries context with
+    number of frames without face (frames) and of consecutive ones (streak),
+    capture time and sequence of the frame.
+    """
+
+    def __new__(cls, context = None, frames = 0, streak = 0, timestamp = None, sequence = None):
+        no_face = super().__new__(cls, (None, None))
+        no_face.context = context
+        no_face.frames = frames
+        no_face.streak = streak
+        no_face.timestamp = timestamp
+        no_face.sequence = sequence
+        return no_face
+
 
 class Cevent:
     """Class representing gaze event, with tracked points scaled to screen, blink and fixation."""
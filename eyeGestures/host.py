@@ -0,0 +1,284 @@
+"""Module providing multi-process host of EyeGestures_v3 trackers."""
+
+import os
+import time
+import queue
+import collections
+import multiprocessing
+from multiprocessing import connection, shared_memory
+
+import numpy as np
+
+from eyeGestures.gevent import Gevent, Cevent
+
+
+def _worker(index, shm_name, slot_size, requests, results, gestures_kwargs):
+    # imported in worker, so parent does not need to load face mesh
+    from eyeGestures import EyeGestures_v3
+
+    # segment is owned (and unlinked) by host, spawned workers share its
+    # resource tracker, so attaching does not register segment twice
+    shm = shared_memory.SharedMemory(name=shm_name)
+    gestures = EyeGestures_v3(**gestures_kwargs)
+
+    try:
+        while True:
+            request = requests.get()
+            if request is None:
+                break
+
+            command, sequence, context = request[:3]
+            if command == "remove":
+                gestures.removeContext(context)
+                continue
+
+            slot, shape, calibration, width, height, timestamp, frame_sequence = request[3:]
+            frame = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf, offset=slot * slot_size)
+            try:
+                gevent, cevent = gestures.step(frame, calibration, width, height, context,
+                                               timestamp, frame_sequence)
+            except Exception as error:
+                # error is raised by host, worker keeps serving other frames
+                results.send((index, sequence, slot, context, repr(error)))
+                continue
+            finally:
+                del frame
+
+            event = None
+            if gevent is not None:
+                event = (tuple(gevent.point), gevent.blink, gevent.fixation, bool(gevent.saccades),
+                         tuple(cevent.point), cevent.acceptance_radius, cevent.calibration_radius,
+                         gevent.timestamp, gevent.processed, gevent.sequence)
+            results.send((index, sequence, slot, context, event))
+    finally:
+        results.close()
+        shm.close()
+
+
+class TrackerHost:
+    """Class running EyeGestures_v3 contexts in pool of worker processes.
+
+    Each worker owns EyeGestures_v3 with contexts assigned to it, context
+    stays on the worker which got its first frame (least loaded one), so its
+    state never moves between processes. Frames are copied into shared
+    memory ring of slots per worker instead of being pickled, only slot
+    index and step arguments go through request queue, gaze events come
+    back as small tuples through result pipe of the worker. Frames of one
+    context are processed in order. Workers run with images=False (slots
+    are reused, so sub frames cut lazily from them would change), gevents
+    have no sub_frame. Frames are stamped with time.monotonic on submit
+    unless capture timestamp is given, monotonic clock is shared by
+    processes, so gevent latency includes transfer to and from worker.
+    Host waits for results together with worker processes, frames in
+    flight of worker which exited (e.g. crashed in native code) fail with
+    RuntimeError, as do later frames of its contexts.
+
+    Usage:
+
+        with TrackerHost(workers=4) as host:
+            host.submit(frame, calibration, width, height, context="camera_0")
+            sequence, gevent, cevent = host.get()
+    """
+
+    # seconds close waits for worker to exit before terminating it
+    CLOSE_TIMEOUT = 5.0
+
+    def __init__(self, workers=None, slots=4, max_frame_shape=(1080, 1920, 3), **gestures_kwargs):
+        self.n_workers = workers or os.cpu_count() or 1
+        self.slots = slots
+        self.slot_size = int(np.prod(max_frame_shape))
+
+        if gestures_kwargs.get("images", False):
+            raise ValueError("Workers do not support images=True, sub frames would refer to reused slots")
+        gestures_kwargs["images"] = False
+        mp_context = multiprocessing.get_context("spawn")
+        self.receivers = []
+        self.requests = []
+        self.memories = []
+        self.workers = []
+        for index in range(self.n_workers):
+            shm = shared_memory.SharedMemory(create=True, size=self.slot_size * slots)
+            requests = mp_context.Queue()
+            receiver, sender = mp_context.Pipe(duplex=False)
+            worker = mp_context.Process(target=_worker, daemon=True,
+                                        args=(index, shm.name, self.slot_size, requests,
+                                              sender, gestures_kwargs))
+            worker.start()
+            # only worker holds sending end, so receiver sees end of pipe when it exits
+            sender.close()
+            self.receivers.append(receiver)
+            self.memories.append(shm)
+            self.requests.append(requests)
+            self.workers.append(worker)
+
+        self.free_slots = [collections.deque(range(slots)) for _ in range(self.n_workers)]
+        self.affinity = dict()
+        self.frames = [0] * self.n_workers
+        self.sequence = 0
+        self.in_flight = 0
+        self.ready = collections.deque()
+        # contexts of frames in flight by sequence, per worker
+        self.pending = [dict() for _ in range(self.n_workers)]
+        self.exited = [False] * self.n_workers
+        self.lost = collections.deque()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def workerOf(self, context):
+        """Function returning index of worker owning context, assigning least loaded one to new context"""
+
+        if context not in self.affinity:
+            loads = [0] * self.n_workers
+            for worker in self.affinity.values():
+                loads[worker] += 1
+            self.affinity[context] = int(np.argmin(loads))
+        return self.affinity[context]
+
+    def submit(self, frame, calibration, width, height, context="main", timestamp=None, frame_sequence=None):
+        """Function sending BGR uint8 frame to worker of context, returns sequence number of frame.
+
+        Sequence number counts frames submitted to host, frame_sequence is
+        number of frame in stream of context, carried by gevent. Blocks while
+        all slots of the worker are in use.
+        """
+
+        if timestamp is None:
+            timestamp = time.monotonic()
+        frame = np.asarray(frame, dtype=np.uint8)
+        if frame.nbytes > self.slot_size:
+            raise ValueError(f"Frame of shape {frame.shape} does not fit into slot of {self.slot_size} bytes")
+
+        worker = self.workerOf(context)
+        while len(self.free_slots[worker]) == 0 and not self.exited[worker]:
+            self.ready.append(self.__receive(None))
+        if self.exited[worker]:
+            raise RuntimeError(f"Worker {worker} of context {context} exited "
+                               f"with code {self.workers[worker].exitcode}")
+        slot = self.free_slots[worker].popleft()
+
+        slot_view = np.ndarray(frame.shape, dtype=np.uint8, buffer=self.memories[worker].buf,
+                               offset=slot * self.slot_size)
+        slot_view[...] = frame
+        del slot_view
+
+        self.sequence += 1
+        self.in_flight += 1
+        self.frames[worker] += 1
+        self.pending[worker][self.sequence] = context
+        self.requests[worker].put(("step", self.sequence, context, slot, frame.shape,
+                                   calibration, width, height, timestamp, frame_sequence))
+        return self.sequence
+
+    def get(self, timeout=None):
+        """Function returning (sequence, gevent, cevent) of next processed frame.
+
+        gevent and cevent are None for frame without face, error of step
+        is raised as RuntimeError when its frame is taken.
+        """
+
+        if self.ready:
+            return self.__unpack(self.ready.popleft())
+        return self.__unpack(self.__receive(timeout))
+
+    def step(self, frame, calibration, width, height, context="main", timestamp=None, frame_sequence=None):
+        """Function processing frame synchronously, returns (gevent, cevent)"""
+
+        sequence = self.submit(frame, calibration, width, height, context, timestamp, frame_sequence)
+        while True:
+            result = self.__receive(None)
+            if result[0] == sequence:
+                return self.__unpack(result)[1:]
+            self.ready.append(result)
+
+    def removeContext(self, context):
+        """Function removing context from its worker"""
+
+        if context in self.affinity:
+            self.requests[self.affinity.pop(context)].put(("remove", None, context))
+
+    def __receive(self, timeout):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.lost:
+            workers = [worker for worker in range(self.n_workers) if not self.exited[worker]]
+            if not workers:
+                raise RuntimeError("All workers exited")
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0.0)
+            ready = connection.wait([self.receivers[worker] for worker in workers] +
+                                    [self.workers[worker].sentinel for worker in workers], remaining)
+            if not ready:
+                raise queue.Empty
+
+            for worker in workers:
+                # results sent before worker exited are read first
+                if self.receivers[worker] in ready:
+                    try:
+                        return self.__result(*self.receivers[worker].recv())
+                    except EOFError:
+                        self.__exited(worker)
+                elif self.workers[worker].sentinel in ready:
+                    self.__exited(worker)
+        return self.lost.popleft()
+
+    def __exited(self, worker):
+        self.exited[worker] = True
+        exitcode = self.workers[worker].exitcode
+        for sequence, context in self.pending[worker].items():
+            self.in_flight -= 1
+            self.lost.append((sequence, RuntimeError(f"Worker {worker} of context {context} exited "
+                                                     f"with code {exitcode}"), None))
+        self.pending[worker].clear()
+
+    def __result(self, worker, sequence, slot, context, event):
+        del self.pending[worker][sequence]
+        self.free_slots[worker].append(slot)
+        self.in_flight -= 1
+
+        # error is kept with result, so it is raised only for its own frame
+        if isinstance(event, str):
+            return (sequence, RuntimeError(f"Step of context {context} failed in worker: {event}"), None)
+        if event is None:
+            return (sequence, None, None)
+        point, blink, fixation, saccades, calibration_point, acceptance_radius, calibration_radius, \
+            timestamp, processed, frame_sequence = event
+        gevent = Gevent(point=np.array(point), blink=blink, fixation=fixation,
+                        saccades=saccades, context=context, timestamp=timestamp,
+                        processed=processed, sequence=frame_sequence)
+        cevent = Cevent(np.array(calibration_point), acceptance_radius, calibration_radius)
+        return (sequence, gevent, cevent)
+
+    @staticmethod
+    def __unpack(result):
+        if isinstance(result[1], Exception):
+            raise result[1]
+        return result
+
+    def getStats(self):
+        """Function returning number of frames and contexts per worker and frames in flight"""
+
+        contexts = [0] * self.n_workers
+        for worker in self.affinity.values():
+            contexts[worker] += 1
+        return {"frames": list(self.frames), "contexts": contexts, "in_flight": self.in_flight}
+
+    def close(self):
+        """Function stopping workers and releasing shared memory"""
+
+        for requests in self.requests:
+            requests.put(None)
+        for worker in self.workers:
+            worker.join(timeout=self.CLOSE_TIMEOUT)
+            if worker.is_alive():
+                worker.terminate()
+                worker.join()
+        for receiver in self.receivers:
+            receiver.close()
+        for shm in self.memories:
+            shm.close()
+            shm.unlink()
+        self.receivers = []
+        self.workers = []
+        self.memories = []
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+from eyeGestures import EyeGestures_v3
+from eyeGestures.host import TrackerHost
+
+
+def test_host_matches_in_process_steps(face_images):
+    images = [face_images["face_1"], face_images["face_2"]]
+    contexts = ["camera_0", "camera_1", "camera_2"]
+
+    local = EyeGestures_v3(images=False)
+    expected = dict()
+    for n in range(6):
+        for m, context in enumerate(contexts):
+            expected[(n, context)] = local.step(images[(n + m) % 2], True, 1920, 1080, context)
+
+    with TrackerHost(workers=2, slots=2, max_frame_shape=images[0].shape) as host:
+        submitted = dict()
+        for n in range(6):
+            for m, context in enumerate(contexts):
+                submitted[host.submit(images[(n + m) % 2], True, 1920, 1080, context)] = (n, context)
+        results = dict(host.get(timeout=60)[:2] for _ in submitted)
+
+        assert [host.workerOf(context) for context in contexts] == [0, 1, 0]
+        assert host.getStats()["frames"] == [12, 6]
+        assert host.getStats()["in_flight"] == 0
+
+        gevent, cevent = host.step(np.zeros((120, 160, 3), np.uint8), False, 1920, 1080, "camera_0")
+        assert gevent is None and cevent is None
+
+    for sequence, gevent in results.items():
+        expected_gevent, _ = expected[submitted[sequence]]
+        assert gevent.context == submitted[sequence][1]
+        assert gevent.sequence == submitted[sequence][0] + 1
+        assert gevent.timestamp <= gevent.processed
+        assert gevent.blink == expected_gevent.blink
+        assert np.allclose(gevent.point, expected_gevent.point)
+        # fixation grows with capture time, which differs between runs
+        assert 0.0 <= gevent.fixation <= 1.0
+
+
+def test_host_raises_error_for_failed_frame_only(face_images):
+    image = face_images["face_1"]
+    # two channel frame fails in color conversion of worker
+    broken = np.zeros((120, 160, 2), np.uint8)
+
+    with TrackerHost(workers=1, slots=1, max_frame_shape=image.shape) as host:
+        failed = host.submit(broken, False, 1920, 1080)
+        # waiting for slot receives failure of previous frame without raising
+        submitted = host.submit(image, False, 1920, 1080)
+        with pytest.raises(RuntimeError):
+            host.get(timeout=60)
+        sequence, gevent, _ = host.get(timeout=60)
+        assert sequence == submitted != failed
+        assert gevent is not None
+
+        host.submit(broken, False, 1920, 1080)
+        gevent, _ = host.step(image, False, 1920, 1080)
+        assert gevent is not None
+        with pytest.raises(RuntimeError):
+            host.get(timeout=60)
+        with pytest.raises(RuntimeError):
+            host.step(broken, False, 1920, 1080)
+        assert host.getStats()["in_flight"] == 0
+
+
+def test_host_fails_frames_of_exited_worker(face_images):
+    image = face_images["face_1"]
+    with pytest.raises(ValueError):
+        TrackerHost(workers=1, images=True)
+
+    with TrackerHost(workers=2, slots=2, max_frame_shape=image.shape) as host:
+        host.submit(image, False, 1920, 1080, "camera_0")
+        host.get(timeout=60)
+        # worker killed as by crash in native code
+        host.workers[0].kill()
+        host.workers[0].join()
+
+        host.submit(image, False, 1920, 1080, "camera_0")
+        submitted = host.submit(image, False, 1920, 1080, "camera_1")
+        with pytest.raises(RuntimeError, match="exited"):
+            host.get(timeout=60)
+        assert host.get(timeout=60)[0] == submitted
+        with pytest.raises(RuntimeError, match="exited"):
+            host.submit(image, False, 1920, 1080, "camera_0")
+        assert host.getStats()["in_flight"] == 0
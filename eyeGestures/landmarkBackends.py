@@ -0,0 +1,242 @@
+"""Module providing landmark backends returning face landmarks as plain arrays.
+
+Every backend takes contiguous RGB image and returns float32 array of shape
+(n_faces, 478, 2) with landmarks normalized to image size (mediapipe face mesh
+topology with iris points), or None when there is no face.
+"""
+
+import cv2
+import numpy as np
+import mediapipe as mp
+import eyeGestures.eye as eye
+
+N_LANDMARKS = 478
+N_MESH_LANDMARKS = 468
+
+
+def complete_iris(landmarks):
+    """Function extending (n_faces, 468, 2) mesh with iris points placed in eye contour centers"""
+
+    n_faces = landmarks.shape[0]
+    completed = np.empty((n_faces, N_LANDMARKS, 2), dtype=np.float32)
+    completed[:, :N_MESH_LANDMARKS] = landmarks
+    # 468-472 iris of right eye, 473-477 iris of left eye
+    completed[:, 468:473] = np.mean(landmarks[:, eye.Eye.RIGHT_EYE_KEYPOINTS], axis=1)[:, None]
+    completed[:, 473:478] = np.mean(landmarks[:, eye.Eye.LEFT_EYE_KEYPOINTS], axis=1)[:, None]
+    return completed
+
+
+class LandmarkBackend:
+    """Base class of landmark backends used by FaceFinder"""
+
+    def process(self, image):
+        """Function returning (n_faces, 478, 2) normalized landmarks for RGB image or None"""
+
+        raise NotImplementedError
+
+    def fork(self):
+        """Function returning backend for independent stream of images (e.g. face crops)
+
+        Stateless backends return themselves.
+        """
+
+        return self
+
+    def close(self):
+        """Function releasing backend resources"""
+
+        pass
+
+
+class MediaPipeBackend(LandmarkBackend):
+    """Backend running mediapipe face mesh"""
+
+    # serialized NormalizedLandmark with x, y and z set:
+    # 0x0a 0x0f | 0x0d x(f32) | 0x15 y(f32) | 0x1d z(f32)
+    LANDMARK_RECORD_SIZE = 17
+    LANDMARK_TAG_OFFSETS = np.array([0, 1, 2, 7, 12])
+    LANDMARK_TAGS = np.array([0x0a, 0x0f, 0x0d, 0x15, 0x1d], dtype=np.uint8)
+
+    def __init__(self, max_num_faces=1, static_image_mode=False,
+                 min_detection_confidence=0.5, min_tracking_confidence=0.5):
+        self.max_num_faces = max_num_faces
+        self.static_image_mode = static_image_mode
+        self.min_detection_confidence = min_detection_confidence
+        self.min_tracking_confidence = min_tracking_confidence
+
+        self.mp_face_mesh = mp.solutions.face_mesh.FaceMesh(
+            max_num_faces=max_num_faces,
+            refine_landmarks=True,
+            static_image_mode=static_image_mode,
+            min_detection_confidence=min_detection_confidence,
+            min_tracking_confidence=min_tracking_confidence
+        )
+
+    @classmethod
+    def toArray(cls, face_mesh):
+        """Function converting mediapipe face mesh result to (n_faces, n_landmarks, 2) array"""
+
+        if face_mesh is None or face_mesh.multi_face_landmarks is None:
+            return None
+
+        faces = [cls.__landmarks(face) for face in face_mesh.multi_face_landmarks]
+        if len(faces) == 1:
+            return faces[0][None]
+        return np.stack(faces)
+
+    @classmethod
+    def __landmarks(cls, landmark_list):
+        n_landmarks = len(landmark_list.landmark)
+
+        # reading protobuf fields one by one is slow, serialized message has
+        # fixed size records, so x and y can be read as strided view
+        raw = landmark_list.SerializeToString()
+        record = cls.LANDMARK_RECORD_SIZE
+        if len(raw) == n_landmarks * record:
+            records = np.frombuffer(raw, dtype=np.uint8).reshape(n_landmarks, record)
+            if (records[:, cls.LANDMARK_TAG_OFFSETS] == cls.LANDMARK_TAGS).all():
+                return np.ndarray((n_landmarks, 2), dtype="<f4", buffer=raw,
+                                  offset=3, strides=(record, 5))
+
+        # fallback for messages with optional fields set (visibility, presence)
+        landmarks = np.empty((n_landmarks, 2), dtype=np.float32)
+        for n, landmark in enumerate(landmark_list.landmark):
+            landmarks[n, 0] = landmark.x
+            landmarks[n, 1] = landmark.y
+        return landmarks
+
+    def process(self, image):
+        return self.toArray(self.mp_face_mesh.process(image))
+
+    def fork(self):
+        return MediaPipeBackend(self.max_num_faces, self.static_image_mode,
+                                self.min_detection_confidence, self.min_tracking_confidence)
+
+    def close(self):
+        self.mp_face_mesh.close()
+
+
+class OpenCVDNNBackend(LandmarkBackend):
+    """Backend running face landmark ONNX model (mediapipe face mesh topology) with OpenCV DNN on CPU.
+
+    Landmark model takes face crop of input_size and returns 468 (x, y, z)
+    points in input pixels, optionally with face presence logit. Outputs are
+    taken by landmarks_output and score_output names, without names largest
+    output holds landmarks and single value output is presence logit (order
+    of outputs differs between exports). Iris points are placed in eye
+    contour centers. With
+    detector_model (YuNet ONNX for cv2.FaceDetectorYN) faces are found on
+    entire image, without it image is assumed to be face crop (e.g. from
+    FaceFinder tracking mode).
+    """
+
+    def __init__(self, landmark_model, detector_model=None, input_size=192,
+                 input_scale=1.0 / 255.0, score_threshold=0.5, margin=0.25, max_num_faces=1,
+                 landmarks_output=None, score_output=None):
+        self.landmark_model = landmark_model
+        self.detector_model = detector_model
+        self.input_size = input_size
+        self.input_scale = input_scale
+        self.score_threshold = score_threshold
+        self.margin = margin
+        self.max_num_faces = max_num_faces
+        self.landmarks_output = landmarks_output
+        self.score_output = score_output
+
+        self.net = cv2.dnn.readNetFromONNX(landmark_model)
+        self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        self.output_names = tuple(self.net.getUnconnectedOutLayersNames())
+        for name in (landmarks_output, score_output):
+            if name is not None and name not in self.output_names:
+                raise ValueError(f"Model has no output {name}, outputs are {self.output_names}")
+
+        self.detector = None
+        if detector_model is not None:
+            self.detector = cv2.FaceDetectorYN.create(
+                detector_model, "", (320, 320), score_threshold)
+
+    def __faceRegions(self, image):
+        height, width = image.shape[:2]
+        if self.detector is None:
+            return [(0, 0, width, height)]
+
+        self.detector.setInputSize((width, height))
+        _, faces = self.detector.detect(cv2.cvtColor(image, cv2.COLOR_RGB2BGR))
+        if faces is None:
+            return []
+
+        regions = []
+        for face in faces[:self.max_num_faces]:
+            x, y, w, h = face[:4]
+            side = max(w, h) * (1.0 + 2 * self.margin)
+            x_0 = int(max(x + w / 2 - side / 2, 0))
+            y_0 = int(max(y + h / 2 - side / 2, 0))
+            x_1 = int(min(x + w / 2 + side / 2, width))
+            y_1 = int(min(y + h / 2 + side / 2, height))
+            if x_1 > x_0 and y_1 > y_0:
+                regions.append((x_0, y_0, x_1 - x_0, y_1 - y_0))
+        return regions
+
+    def __landmarksAndScore(self, outputs):
+        named = dict(zip(self.output_names, outputs))
+        if self.landmarks_output is not None:
+            landmarks = named[self.landmarks_output]
+        else:
+            landmarks = max(outputs, key=np.size)
+
+        if self.score_output is not None:
+            return landmarks, named[self.score_output]
+        scores = [output for output in outputs if np.size(output) == 1]
+        return landmarks, (scores[0] if scores else None)
+
+    def process(self, image):
+        height, width = image.shape[:2]
+
+        faces = []
+        for x, y, w, h in self.__faceRegions(image):
+            blob = cv2.dnn.blobFromImage(image[y:y + h, x:x + w], self.input_scale,
+                                         (self.input_size, self.input_size))
+            self.net.setInput(blob)
+            landmarks, score = self.__landmarksAndScore(self.net.forward(self.output_names))
+
+            if score is not None:
+                score = 1.0 / (1.0 + np.exp(-float(np.ravel(score)[0])))
+                if score < self.score_threshold:
+                    continue
+
+            points = np.asarray(landmarks, dtype=np.float32).reshape(-1, 3)[:N_MESH_LANDMARKS, :2]
+            points = points / self.input_size * (w, h) + (x, y)
+            faces.append(points / (width, height))
+
+        if len(faces) == 0:
+            return None
+        return complete_iris(np.array(faces, dtype=np.float32))
+
+
+class PrecomputedBackend(LandmarkBackend):
+    """Backend returning landmarks read from arrays, one entry per processed frame.
+
+    Entries are (n_landmarks, 2) or (n_faces, n_landmarks, 2) arrays or None
+    for frames without face. Landmarks are normalized to image size unless
+    normalized is False, then they are given in pixels. Landmarks refer to
+    entire frame, so backend should not be used with FaceFinder tracking mode.
+    """
+
+    def __init__(self, landmarks, normalized=True):
+        self.landmarks = iter(landmarks)
+        self.normalized = normalized
+
+    def process(self, image):
+        landmarks = next(self.landmarks, None)
+        if landmarks is None:
+            return None
+
+        landmarks = np.array(landmarks, dtype=np.float32)
+        if landmarks.ndim == 2:
+            landmarks = landmarks[None]
+        if landmarks.shape[1] == N_MESH_LANDMARKS:
+            landmarks = complete_iris(landmarks)
+        if not self.normalized:
+            landmarks /= np.array(image.shape[1::-1], dtype=np.float32)
+        return landmarks
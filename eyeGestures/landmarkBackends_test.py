@@ -0,0 +1,116 @@
+import cv2
+import numpy as np
+import pytest
+from eyeGestures.eye import Eye
+from eyeGestures.face import FaceFinder, Face
+from eyeGestures.landmarkBackends import MediaPipeBackend, OpenCVDNNBackend, PrecomputedBackend, complete_iris
+
+
+def test_mediapipe_backend_returns_normalized_array(face_images):
+    image = cv2.cvtColor(face_images["face_1"], cv2.COLOR_BGR2RGB)
+
+    landmarks = MediaPipeBackend().process(image)
+
+    assert landmarks.shape == (1, 478, 2)
+    assert landmarks.dtype == np.float32
+    assert (landmarks > 0.0).all() and (landmarks < 1.0).all()
+
+
+def test_mediapipe_backend_without_face():
+    assert MediaPipeBackend().process(np.zeros((240, 320, 3), dtype=np.uint8)) is None
+
+
+def test_complete_iris_places_pupils_in_eye_centers():
+    mesh = np.random.RandomState(0).rand(2, 468, 2).astype(np.float32)
+
+    landmarks = complete_iris(mesh)
+
+    assert landmarks.shape == (2, 478, 2)
+    assert np.array_equal(landmarks[:, :468], mesh)
+    assert np.allclose(landmarks[:, 468], np.mean(mesh[:, Eye.RIGHT_EYE_KEYPOINTS], axis=1))
+
+
+def test_precomputed_backend_matches_mediapipe(face_images):
+    image = face_images["face_2"]
+    landmarks = FaceFinder().find(image)
+
+    face = Face()
+    face.process(image, landmarks)
+
+    finder = FaceFinder(backend=PrecomputedBackend([landmarks[0] * (image.shape[1], image.shape[0]), None],
+                                                   normalized=False))
+    precomputed = Face()
+    precomputed.process(image, finder.find(image))
+
+    assert np.allclose(precomputed.getLandmarks(), face.getLandmarks(), atol=1e-3)
+    assert finder.find(image) is None
+
+
+class FakeNet:
+    # landmark model with presence score listed as first output
+
+    def __init__(self, points, logit):
+        self.points = points
+        self.logit = logit
+        self.blobs = []
+
+    def setPreferableBackend(self, backend):
+        pass
+
+    def setPreferableTarget(self, target):
+        pass
+
+    def getUnconnectedOutLayersNames(self):
+        return ("score", "landmarks")
+
+    def setInput(self, blob):
+        self.blobs.append(blob)
+
+    def forward(self, names):
+        outputs = {"score": np.array([[self.logit]], np.float32),
+                   "landmarks": np.concatenate((self.points, np.zeros((468, 1))), axis=1).reshape(1, -1)}
+        return [outputs[name] for name in names]
+
+
+class FakeDetector:
+
+    def setInputSize(self, size):
+        self.size = size
+
+    def detect(self, image):
+        # face box x, y, w, h followed by key points and score
+        return 1, np.array([[40, 20, 40, 40] + [0] * 11], np.float32)
+
+
+@pytest.fixture
+def fake_dnn(monkeypatch):
+    net = FakeNet(np.random.RandomState(0).uniform(0, 192, (468, 2)), 3.0)
+    monkeypatch.setattr(cv2.dnn, "readNetFromONNX", lambda model: net)
+    monkeypatch.setattr(cv2.FaceDetectorYN, "create", lambda *args: FakeDetector())
+    return net
+
+
+def test_opencv_dnn_backend_scales_crop_landmarks(fake_dnn):
+    image = np.zeros((100, 200, 3), np.uint8)
+
+    # without detector image is face crop
+    landmarks = OpenCVDNNBackend("landmarks.onnx").process(image)
+    assert landmarks.shape == (1, 478, 2)
+    assert np.allclose(landmarks[0, :468], fake_dnn.points / 192)
+    assert fake_dnn.blobs[-1].shape == (1, 3, 192, 192)
+
+    # face box widened by margin to square region (30, 10, 60, 60)
+    landmarks = OpenCVDNNBackend("landmarks.onnx", detector_model="yunet.onnx").process(image)
+    assert np.allclose(landmarks[0, :468], (fake_dnn.points / 192 * 60 + (30, 10)) / (200, 100))
+
+
+def test_opencv_dnn_backend_outputs_and_score(fake_dnn):
+    image = np.zeros((100, 200, 3), np.uint8)
+    named = OpenCVDNNBackend("landmarks.onnx", landmarks_output="landmarks", score_output="score")
+    assert np.allclose(named.process(image)[0, :468], fake_dnn.points / 192)
+
+    fake_dnn.logit = -3.0
+    assert OpenCVDNNBackend("landmarks.onnx").process(image) is None
+    assert OpenCVDNNBackend("landmarks.onnx", score_threshold=0.01).process(image) is not None
+    with pytest.raises(ValueError):
+        OpenCVDNNBackend("landmarks.onnx", score_output="presence")
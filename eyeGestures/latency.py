@@ -0,0 +1,143 @@
+"""Module providing low overhead latency histograms of processing stages."""
+
+import json
+import time
+import threading
+
+
+class LatencyHistogram:
+    """Class counting durations (ns) in fixed log-linear buckets.
+
+    Every doubling of duration is split into 8 linear buckets (6-12% wide),
+    buckets cover all 64 bit durations, so memory is fixed and recording
+    costs few integer operations. Percentiles are read as centers of buckets.
+    """
+
+    SUB_BUCKETS = 8
+    OCTAVES = 64
+
+    def __init__(self):
+        self.counts = [0] * (self.OCTAVES * self.SUB_BUCKETS)
+        self.total = 0
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def record(self, duration):
+        """Function adding duration in nanoseconds"""
+
+        # octave from bit length, sub bucket from 3 bits following leading one
+        length = duration.bit_length()
+        self.counts[((length - 1) << 3) + ((duration >> (length - 4)) & 7) if length > 3 else 0] += 1
+        self.total += duration
+
+    def percentile(self, percent):
+        """Function returning approximate percentile of recorded durations in nanoseconds"""
+
+        count = self.count
+        if count == 0:
+            return None
+        rank = percent / 100.0 * count
+        cumulative = 0
+        sub_buckets = self.SUB_BUCKETS
+        for bucket, bucket_count in enumerate(self.counts):
+            cumulative += bucket_count
+            if cumulative >= rank and bucket_count > 0:
+                octave, sub_bucket = divmod(bucket, sub_buckets)
+                return 2.0 ** octave * (1.0 + (sub_bucket + 0.5) / sub_buckets)
+        return None
+
+    def getStats(self):
+        """Function returning count and mean, p50, p95 and p99 in milliseconds"""
+
+        count = self.count
+        if count == 0:
+            return {"count": 0, "mean": None, "p50": None, "p95": None, "p99": None}
+        return {
+            "count": count,
+            "mean": self.total / count * 1e-6,
+            "p50": self.percentile(50) * 1e-6,
+            "p95": self.percentile(95) * 1e-6,
+            "p99": self.percentile(99) * 1e-6,
+        }
+
+
+class LatencyRecorder:
+    """Class recording durations of consecutive stages of single context.
+
+    start marks beginning of processing, every mark records time elapsed
+    since previous start or mark under name of stage. Time of previous start
+    or mark is kept per thread, so stages run by different threads (e.g.
+    Pipeline stages) are timed independently.
+    """
+
+    def __init__(self):
+        self.stages = dict()
+        self.local = threading.local()
+        self.local.last = time.perf_counter_ns()
+
+    def start(self):
+        self.local.last = time.perf_counter_ns()
+
+    def mark(self, stage):
+        now = time.perf_counter_ns()
+        local = self.local
+        try:
+            last = local.last
+        except AttributeError:
+            # thread marking without start records nothing
+            local.last = now
+            return
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            histogram = self.stages[stage] = LatencyHistogram()
+        histogram.record(now - last)
+        local.last = now
+
+    def getStats(self):
+        return {stage: histogram.getStats() for stage, histogram in self.stages.items()}
+
+
+class Instrumentation:
+    """Class keeping latency recorders of contexts.
+
+    Trackers keep None instead of instrumentation when it is disabled, so
+    disabled instrumentation costs only check of None per stage.
+    """
+
+    def __init__(self):
+        self.recorders = dict()
+        self.lock = threading.Lock()
+
+    def recorder(self, context):
+        """Function returning recorder of context, created on first use"""
+
+        recorder = self.recorders.get(context)
+        if recorder is None:
+            with self.lock:
+                recorder = self.recorders.setdefault(context, LatencyRecorder())
+        return recorder
+
+    def getStats(self, context=None):
+        """Function returning {context: {stage: stats}}, or {stage: stats} of single context"""
+
+        if context is not None:
+            return self.recorder(context).getStats()
+        return {context: recorder.getStats() for context, recorder in list(self.recorders.items())}
+
+    def dump(self, path=None, indent=2):
+        """Function returning stats of all contexts as JSON, written to path when given"""
+
+        dumped = json.dumps(self.getStats(), indent=indent)
+        if path is not None:
+            with open(path, "w") as file:
+                file.write(dumped)
+        return dumped
+
+    def reset(self):
+        """Function clearing recorded durations, recorders stay bound to contexts"""
+
+        with self.lock:
+            for recorder in self.recorders.values():
+                recorder.stages = dict()
@@ -0,0 +1,115 @@
+import json
+import time
+import threading
+import numpy as np
+from eyeGestures import EyeGestures_v3, EyeGestures_v2
+from eyeGestures.latency import LatencyHistogram, LatencyRecorder
+
+
+def test_histogram_percentiles():
+    histogram = LatencyHistogram()
+    durations = np.random.default_rng(0).lognormal(np.log(2e6), 0.5, 5000)
+    for duration in durations:
+        histogram.record(int(duration))
+
+    stats = histogram.getStats()
+    assert stats["count"] == 5000
+    for percent in (50, 95, 99):
+        assert abs(stats[f"p{percent}"] / (np.percentile(durations, percent) * 1e-6) - 1) < 0.1
+    assert abs(stats["mean"] / (np.mean(durations) * 1e-6) - 1) < 1e-6
+    assert LatencyHistogram().getStats()["p50"] is None
+
+
+def test_recorder_overhead_is_small():
+    recorder = LatencyRecorder()
+    recorder.start()
+    n_marks = 20000
+    for _ in range(n_marks):
+        recorder.mark("stage")
+
+    # every mark records duration of previous one, so p50 bounds cost of mark
+    assert recorder.getStats()["stage"]["p50"] < 0.01
+
+
+def test_step_latency_per_context(face_images):
+    image = face_images["face_1"]
+
+    gestures = EyeGestures_v3()
+    gestures.step(image, False, 1920, 1080, context="a")
+    assert gestures.getLatencyStats() is None
+
+    gestures.enableInstrumentation()
+    for context in ("a", "b", "a"):
+        gestures.step(image, False, 1920, 1080, context=context)
+
+    stats = gestures.getLatencyStats()
+    assert set(stats) == {"a", "b"}
+    assert set(stats["a"]) == {"landmarks", "features", "filter", "regression",
+                               "averaging", "fixation", "calibration"}
+    assert stats["a"]["landmarks"]["count"] == 2
+    assert stats["b"]["calibration"]["count"] == 1
+    assert json.loads(gestures.dumpLatencyStats()) == json.loads(json.dumps(stats))
+
+    v2 = EyeGestures_v2()
+    v2.enableInstrumentation()
+    v2.step(image, False, 1920, 1080)
+    assert v2.getLatencyStats("main")["landmarks"]["count"] == 1
+
+
+def test_recorder_times_threads_independently():
+    recorder = LatencyRecorder()
+    first_started = threading.Event()
+    second_started = threading.Event()
+
+    def first():
+        recorder.start()
+        first_started.set()
+        second_started.wait()
+        time.sleep(0.05)
+        recorder.mark("first")
+
+    def second():
+        first_started.wait()
+        time.sleep(0.05)
+        recorder.start()
+        second_started.set()
+        recorder.mark("second")
+
+    threads = [threading.Thread(target=first), threading.Thread(target=second)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = recorder.getStats()
+    # start of second thread does not shorten stage of first one
+    assert stats["first"]["p50"] > 90.0
+    assert stats["second"]["p50"] < 40.0
+
+
+class CountingRecorder(LatencyRecorder):
+
+    def __init__(self):
+        super().__init__()
+        self.starts = 0
+
+    def start(self):
+        self.starts += 1
+        super().start()
+
+
+def test_step_starts_timer_once_per_frame(face_images):
+    gestures = EyeGestures_v3()
+    gestures.enableInstrumentation()
+    recorder = gestures.addContext("main").latency = CountingRecorder()
+
+    started = time.perf_counter()
+    for _ in range(3):
+        gestures.step(face_images["face_1"], False, 1920, 1080)
+    elapsed = time.perf_counter() - started
+
+    assert recorder.starts == 3
+    # stages of frame cover step from landmarks to calibration
+    stats = recorder.getStats()
+    covered = sum(stage["mean"] * stage["count"] for stage in stats.values()) * 1e-3
+    assert 0.8 * elapsed < covered <= elapsed
@@ -0,0 +1,209 @@
+"""Module providing pipelined execution of EyeGestures_v3 steps."""
+
+import time
+import queue
+import threading
+
+from eyeGestures.gevent import NoFace
+
+# marker passed through stages after last frame of map
+_END = object()
+
+
+class Pipeline:
+    """Class running EyeGestures_v3 step as stages connected by bounded queues.
+
+    landmarks stage runs color conversion, landmark inference and key point
+    building, gaze stage runs regression, calibration bookkeeping and
+    fixation, each stage on its own thread. Landmarks of frame N+1 are
+    computed while frame N is post-processed, so throughput approaches
+    1/(slowest stage) instead of 1/(sum of stages). Every stage has single
+    worker, so frames are processed and returned in submission order. Both
+    stages hold lock of context while they touch its state, so step (or
+    other pipeline) on the same context does not race with stages, its
+    frames are interleaved with frames of pipeline. Frames without capture
+    timestamp are stamped on submit, so velocities use capture time, not
+    time of post-processing.
+
+    Usage:
+
+        with Pipeline(gestures) as pipeline:
+            for gevent, cevent in pipeline.map(frames, calibration, width, height):
+                ...
+
+    or submit frames and get results in order. Frames without face give
+    NoFace as step does, exceptions raised by stages are raised by get and
+    map.
+    """
+
+    STAGES = ("capture", "landmarks", "gaze")
+
+    def __init__(self, gestures, maxsize=2):
+        self.gestures = gestures
+        self.maxsize = maxsize
+
+        self.__landmarks_queue = queue.Queue(maxsize)
+        self.__gaze_queue = queue.Queue(maxsize)
+        # results are not bounded, so stages never block on caller
+        self.__results = queue.Queue()
+
+        self.__busy = {stage: 0.0 for stage in self.STAGES}
+        self.__frames = {stage: 0 for stage in self.STAGES}
+        self.__threads = []
+        self.__start = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def start(self):
+        """Function starting stage threads"""
+
+        if self.__threads:
+            return
+        self.__start = time.perf_counter()
+        self.__threads = [
+            threading.Thread(target=self.__worker, daemon=True,
+                             args=("landmarks", self.__landmarks_queue, self.__gaze_queue, self.__landmarks)),
+            threading.Thread(target=self.__worker, daemon=True,
+                             args=("gaze", self.__gaze_queue, self.__results, self.__gaze)),
+        ]
+        for thread in self.__threads:
+            thread.start()
+
+    def stop(self):
+        """Function finishing frames in flight and stopping stage threads"""
+
+        if not self.__threads:
+            return
+        self.__landmarks_queue.put(None)
+        for thread in self.__threads:
+            thread.join()
+        self.__threads = []
+        # results not taken by caller are dropped up to sentinel forwarded by gaze stage
+        while self.__results.get() is not None:
+            pass
+
+    def submit(self, frame, calibration, width, height, context="main", timestamp=None, sequence=None):
+        """Function queueing frame for step, blocks while landmarks stage is full"""
+
+        if timestamp is None:
+            timestamp = time.monotonic()
+        self.__landmarks_queue.put((frame, calibration, width, height, context, timestamp, sequence))
+
+    def get(self, timeout=None):
+        """Function returning (gevent, cevent) of oldest submitted frame"""
+
+        result = self.__results.get(timeout=timeout)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def map(self, frames, calibration, width, height, context="main"):
+        """Generator yielding (gevent, cevent) for every frame of iterable.
+
+        Frames are read from iterable (e.g. generator reading camera) in
+        capture stage thread, so capture overlaps with other stages too.
+        When map exits early (error of stage or caller leaving loop), capture
+        stops and results of frames already in flight are dropped.
+        """
+
+        self.start()
+        cancel = threading.Event()
+        feeder = threading.Thread(target=self.__capture, daemon=True,
+                                  args=(iter(frames), calibration, width, height, context, cancel))
+        feeder.start()
+        result = None
+        try:
+            while True:
+                result = self.__results.get()
+                if result is _END:
+                    break
+                if isinstance(result, Exception):
+                    raise result
+                yield result
+        finally:
+            cancel.set()
+            while result is not _END:
+                result = self.__results.get()
+            feeder.join()
+
+    def __capture(self, frames, calibration, width, height, context, cancel):
+        while not cancel.is_set():
+            start = time.perf_counter()
+            frame = next(frames, _END)
+            if frame is _END:
+                break
+            self.__busy["capture"] += time.perf_counter() - start
+            self.__frames["capture"] += 1
+            self.submit(frame, calibration, width, height, context)
+        self.__landmarks_queue.put(_END)
+
+    def __worker(self, stage, inputs, outputs, process):
+        while True:
+            item = inputs.get()
+            if item is None or item is _END:
+                outputs.put(item)
+                if item is None:
+                    break
+                continue
+
+            if isinstance(item, Exception):
+                outputs.put(item)
+                continue
+
+            start = time.perf_counter()
+            try:
+                item = process(*item)
+            except Exception as error:
+                item = error
+            self.__busy[stage] += time.perf_counter() - start
+            self.__frames[stage] += 1
+            outputs.put(item)
+
+    def __landmarks(self, frame, calibration, width, height, context, timestamp, sequence):
+        tracker_context = self.gestures.addContext(context)
+        with tracker_context.lock:
+            sequence = tracker_context.nextSequence(sequence)
+            # stages run on own threads, each starts its own timer of frame
+            if tracker_context.latency is not None:
+                tracker_context.latency.start()
+            landmarks = self.gestures.getLandmarks(frame, context)
+        if landmarks is None:
+            return (None, None, None, calibration, width, height, context, timestamp, sequence)
+        key_points, blink, sub_frame = landmarks
+        return (key_points, blink, sub_frame, calibration, width, height, context, timestamp, sequence)
+
+    def __gaze(self, key_points, blink, sub_frame, calibration, width, height, context, timestamp, sequence):
+        tracker_context = self.gestures.addContext(context)
+        with tracker_context.lock:
+            if key_points is None:
+                return NoFace(context, tracker_context.no_face_frames, tracker_context.no_face_streak,
+                              timestamp, sequence)
+            tracker_context.calibration = calibration
+            if tracker_context.latency is not None:
+                tracker_context.latency.start()
+            return self.gestures._stepKeyPoints(key_points, blink, sub_frame, width, height, context,
+                                                timestamp, sequence)
+
+    def getStats(self):
+        """Function returning per stage processed frames, busy time (s), occupancy and queue length.
+
+        Occupancy is fraction of time since start spent by stage on frames,
+        stage with occupancy close to 1 limits throughput.
+        """
+
+        elapsed = time.perf_counter() - self.__start if self.__start is not None else 0.0
+        queues = {"capture": 0, "landmarks": self.__landmarks_queue.qsize(), "gaze": self.__gaze_queue.qsize()}
+        return {
+            stage: {
+                "frames": self.__frames[stage],
+                "busy": self.__busy[stage],
+                "occupancy": self.__busy[stage] / elapsed if elapsed > 0 else 0.0,
+                "queue": queues[stage],
+            }
+            for stage in self.STAGES
+        }
@@ -0,0 +1,97 @@
+import queue
+import numpy as np
+import pytest
+from eyeGestures import EyeGestures_v3
+
+
+def test_pipeline_matches_step_order(face_images, fitted_calibrator):
+    images = [face_images["face_1"], face_images["face_2"]]
+    frames = [images[n % 2] for n in range(6)] + [np.zeros((240, 320, 3), np.uint8)] + [images[0]] * 3
+
+    sequential = EyeGestures_v3(filter_min_cutoff=None)
+    pipelined = EyeGestures_v3(filter_min_cutoff=None)
+    for gestures in (sequential, pipelined):
+        gestures.addContext("a").clb = fitted_calibrator
+    expected = [sequential.step(frame, False, 1920, 1080, context="a") for frame in frames]
+
+    with pipelined.pipeline() as pipeline:
+        results = list(pipeline.map(frames, False, 1920, 1080, context="a"))
+        stats = pipeline.getStats()
+
+    assert len(results) == len(frames)
+    for (gevent, _), (expected_gevent, _) in zip(results, expected):
+        if expected_gevent is None:
+            assert gevent is None
+        else:
+            assert np.allclose(gevent.point, expected_gevent.point)
+            assert gevent.point.any()
+            assert 0.0 <= gevent.fixation <= 1.0
+            assert gevent.context == "a"
+    assert stats["landmarks"]["frames"] == len(frames)
+    assert stats["capture"]["frames"] == len(frames)
+    assert 0.0 < stats["landmarks"]["occupancy"] <= 1.0
+
+
+def test_pipeline_submit_get_keeps_contexts(face_images):
+    image = face_images["face_1"]
+    gestures = EyeGestures_v3()
+
+    with gestures.pipeline(maxsize=1) as pipeline:
+        for n in range(4):
+            pipeline.submit(image, n == 0, 1920, 1080, context=f"c{n % 2}")
+        contexts = [pipeline.get(timeout=30)[0].context for _ in range(4)]
+
+    assert contexts == ["c0", "c1", "c0", "c1"]
+    assert not gestures.contexts["c0"].calibration and not gestures.contexts["c1"].calibration
+
+
+def test_pipeline_records_stage_latencies(face_images):
+    image = face_images["face_1"]
+    gestures = EyeGestures_v3()
+    gestures.enableInstrumentation()
+
+    with gestures.pipeline() as pipeline:
+        list(pipeline.map([image] * 4, False, 1920, 1080))
+
+    stats = gestures.getLatencyStats("main")
+    assert stats["landmarks"]["count"] == 4
+    assert stats["calibration"]["count"] == 4
+    # landmarks inference dominates, stages of gaze thread are not charged with it
+    assert stats["landmarks"]["p50"] > 10 * stats["regression"]["p50"]
+
+
+def test_pipeline_restarts_cleanly_after_stage_error(face_images):
+    image = face_images["face_1"]
+    gestures = EyeGestures_v3()
+    pipeline = gestures.pipeline()
+
+    # frame which is not an image fails in landmarks stage
+    with pytest.raises(AttributeError):
+        for _ in pipeline.map([image, "broken"] + [image] * 6, False, 1920, 1080):
+            pass
+    pipeline.stop()
+
+    with pipeline:
+        pipeline.submit(image, False, 1920, 1080)
+        gevent, _ = pipeline.get(timeout=30)
+        assert gevent is not None and gevent.context == "main"
+
+
+def test_pipeline_stages_take_context_lock(face_images):
+    image = face_images["face_1"]
+    gestures = EyeGestures_v3()
+    tracker_context = gestures.addContext("main")
+
+    with gestures.pipeline() as pipeline:
+        # stage waits while step of the same context holds its lock
+        with tracker_context.lock:
+            pipeline.submit(image, False, 1920, 1080)
+            with pytest.raises(queue.Empty):
+                pipeline.get(timeout=0.5)
+        gevent, _ = pipeline.get(timeout=30)
+        assert gevent.sequence == 1
+
+        step_gevent, _ = gestures.step(image, False, 1920, 1080)
+        pipeline.submit(image, False, 1920, 1080)
+        gevent, _ = pipeline.get(timeout=30)
+        assert (step_gevent.sequence, gevent.sequence) == (2, 3)
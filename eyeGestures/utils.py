@@ -55,6 +55,69 @@ def low_pass_filter_fourier(data, cutoff_frequency):
         filtered_data[:, col] = np.fft.ifft(fft_data).real
     return filtered_data
 
+class OneEuroFilter:
+    """Streaming One Euro filter smoothing arrays of values over time.
+
+    Every element is filtered independently with exponential smoothing whose
+    cutoff frequency grows with speed of change: min_cutoff (Hz) removes
+    jitter of still values, beta lowers lag of fast movements. Smoothing is
+    driven by timestamps (seconds), so it does not depend on frame rate, and
+    costs O(1) per frame.
+    """
+
+    def __init__(self, min_cutoff=1.0, beta=0.0, derivative_cutoff=1.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.derivative_cutoff = derivative_cutoff
+        self.reset()
+
+    @staticmethod
+    def alpha(cutoff, dt):
+        """Function returning smoothing factor of exponential filter with cutoff frequency"""
+
+        return 1.0 / (1.0 + 1.0 / (2 * np.pi * cutoff * dt))
+
+    def filter(self, values, timestamp):
+        """Function returning filtered copy of values observed at timestamp"""
+
+        values = np.asarray(values, dtype=float)
+        if self.value is None or self.value.shape != values.shape:
+            self.value = values.copy()
+            self.derivative = np.zeros_like(self.value)
+            self.timestamp = timestamp
+            return self.value.copy()
+
+        dt = timestamp - self.timestamp
+        if dt <= 0:
+            return self.value.copy()
+        self.timestamp = timestamp
+
+        derivative = (values - self.value) / dt
+        self.derivative += self.alpha(self.derivative_cutoff, dt) * (derivative - self.derivative)
+        cutoff = self.min_cutoff + self.beta * np.abs(self.derivative)
+        self.value += self.alpha(cutoff, dt) * (values - self.value)
+        return self.value.copy()
+
+    def filterSequence(self, values, timestamps):
+        """Function returning filtered (T, ...) values observed at T timestamps.
+
+        Filter is recursive, so values are processed one by one, equivalent
+        to calling filter for each of them.
+        """
+
+        filtered = np.empty(np.shape(values), dtype=float)
+        for n, timestamp in enumerate(timestamps):
+            filtered[n] = self.filter(values[n], timestamp)
+        return filtered
+
+    def reset(self):
+        """Function forgetting filter state, next values pass through unchanged"""
+
+        self.value = None
+        self.derivative = None
+        self.timestamp = None
+
+
 def shape_to_np(shape, dtype="int"):
     """
     shape_to_np
@@ -155,16 +218,87 @@ class Buffor:
     def clear(self):
         self.__buffor = []
 
+class RingBuffer:
+    """Fixed capacity buffer of arrays with running sum.
+
+    Values are written in place into preallocated storage (allocated on first
+    add from shape of value), so adding, sum and mean cost O(1) regardless
+    of capacity. Running sum is recomputed from storage once per wrap to
+    keep floating point error bounded.
+    """
+
+    def __init__(self, capacity, dtype=float):
+        self.capacity = capacity
+        self.dtype = dtype
+        self.clear()
+
+    def add(self, value):
+        value = np.asarray(value, dtype=self.dtype)
+        if self.__storage is None:
+            self.__storage = np.zeros((self.capacity,) + value.shape, dtype=self.dtype)
+            self.__sum = np.zeros(value.shape, dtype=self.dtype)
+
+        slot = self.__storage[self.__head]
+        self.__sum -= slot
+        slot[...] = value
+        self.__sum += slot
+
+        self.__head = (self.__head + 1) % self.capacity
+        self.__len = min(self.__len + 1, self.capacity)
+        if self.__head == 0:
+            np.sum(self.__storage, axis=0, out=self.__sum)
+
+    def getSum(self):
+        return self.__sum
+
+    def getMean(self):
+        return self.__sum / max(self.__len, 1)
+
+    def getLen(self):
+        return self.__len
+
+    def isFull(self):
+        return self.__len >= self.capacity
+
+    def getLatest(self):
+        return self.__storage[(self.__head - 1) % self.capacity]
+
+    def getBuffer(self):
+        """Function returning copy of values ordered from oldest to latest"""
+
+        if self.__storage is None:
+            return np.zeros((0,), dtype=self.dtype)
+        start = self.__head - self.__len
+        return self.__storage[np.arange(start, self.__head) % self.capacity]
+
+    def clear(self):
+        self.__storage = None
+        self.__sum = None
+        self.__head = 0
+        self.__len = 0
+
 # Bufforless
 
 
 class VideoCapture:
-    """Wrapper on openCV2 stream making it bufforless and adding camera search"""
+    """Wrapper on openCV2 stream making it bufforless and adding camera search.
+
+    Every frame is stamped with time.monotonic capture time and sequence
+    number when it is grabbed, readStamped returns them with frame, read
+    keeps them in timestamp and sequence. Frames discarded in bufforless
+    mode show up as gaps in sequence and are counted by getStats.
+    """
 
     def __init__(self, name, bufforless=True):
         self.bufforless = bufforless
         self.run = True
 
+        # stamps of last read frame and counters of captured and discarded frames
+        self.timestamp = None
+        self.sequence = 0
+        self.captured = 0
+        self.dropped = 0
+
         if isinstance(name, str):
             if ".pkl" in name:
                 self.stream = False
@@ -204,14 +338,17 @@ class VideoCapture:
     def __reader(self):
         while self.run:
             ret, frame = self.cap.read()
+            timestamp = time.monotonic()
             if not ret:
                 break
+            self.captured += 1
             if not self.q.empty() and self.bufforless:
                 try:
                     self.q.get_nowait()
+                    self.dropped += 1
                 except queue.Empty:
                     pass
-            self.q.put((ret, frame))
+            self.q.put((ret, frame, timestamp, self.captured))
 
         self.flush()
 
@@ -221,12 +358,24 @@ class VideoCapture:
 
     def read(self):
         """Function returning latest frame"""
+        ret, frame, _, _ = self.readStamped()
+        return ret, frame
+
+    def readStamped(self):
+        """Function returning latest frame with its capture timestamp and sequence number"""
         if self.stream:
-            return self.q.get()
+            ret, frame, self.timestamp, self.sequence = self.q.get()
         else:
             frame = self.frames.pop(0)
             self.frames.pop(0)
-            return ((len(self.frames) >= 1), frame)
+            ret = len(self.frames) >= 1
+            self.captured += 1
+            self.timestamp, self.sequence = time.monotonic(), self.captured
+        return ret, frame, self.timestamp, self.sequence
+
+    def getStats(self):
+        """Function returning numbers of captured frames and frames discarded before read"""
+        return {"captured": self.captured, "dropped": self.dropped}
 
     def close(self):
         """Function closing stream"""
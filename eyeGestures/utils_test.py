@@ -0,0 +1,91 @@
+import pickle
+import numpy as np
+from eyeGestures.utils import OneEuroFilter, RingBuffer, VideoCapture
+
+
+def test_one_euro_passes_constant_values():
+    values = np.random.default_rng(0).uniform(0, 100, (32, 2))
+    one_euro = OneEuroFilter(min_cutoff=1.0, beta=0.1)
+
+    for n in range(10):
+        filtered = one_euro.filter(values, n / 30)
+
+    assert np.allclose(filtered, values)
+
+
+def test_one_euro_reduces_jitter():
+    rng = np.random.default_rng(0)
+    one_euro = OneEuroFilter(min_cutoff=1.0)
+
+    filtered = np.array([one_euro.filter(50 + rng.normal(0, 1, (32, 2)), n / 30) for n in range(300)])
+
+    assert np.std(filtered[30:]) < 0.5
+
+
+def test_one_euro_beta_reduces_lag():
+    slow = OneEuroFilter(min_cutoff=1.0, beta=0.0)
+    fast = OneEuroFilter(min_cutoff=1.0, beta=0.1)
+
+    for n in range(30):
+        position = np.full((1, 2), 10.0 * n)
+        lag_slow = np.abs(slow.filter(position, n / 30) - position).max()
+        lag_fast = np.abs(fast.filter(position, n / 30) - position).max()
+
+    assert lag_fast < lag_slow / 2
+
+
+def test_one_euro_ignores_repeated_timestamp():
+    one_euro = OneEuroFilter()
+    one_euro.filter(np.zeros(2), 1.0)
+
+    assert np.array_equal(one_euro.filter(np.ones(2), 1.0), np.zeros(2))
+    one_euro.reset()
+    assert np.array_equal(one_euro.filter(np.ones(2), 1.0), np.ones(2))
+
+
+def test_ring_buffer_matches_shifted_window():
+    rng = np.random.default_rng(0)
+    ring = RingBuffer(20)
+    window = np.zeros((20, 2))
+
+    for n in range(75):
+        value = rng.uniform(0, 1000, 2)
+        window[1:] = window[:-1]
+        window[0] = value
+        ring.add(value)
+
+        assert ring.getLen() == min(n + 1, 20)
+        assert np.allclose(ring.getSum(), np.sum(window, axis=0))
+        assert np.array_equal(ring.getLatest(), value)
+
+    assert ring.isFull()
+    assert np.allclose(ring.getMean(), np.mean(window, axis=0))
+    assert np.array_equal(ring.getBuffer(), window[::-1])
+
+
+def test_ring_buffer_partial_fill():
+    ring = RingBuffer(10)
+    for n in range(3):
+        ring.add(np.full((32, 2), n))
+
+    assert not ring.isFull()
+    assert ring.getBuffer().shape == (3, 32, 2)
+    assert np.allclose(ring.getMean(), 1.0)
+
+    ring.clear()
+    assert ring.getLen() == 0
+
+
+def test_video_capture_stamps_frames(tmp_path):
+    recording = tmp_path / "recording.pkl"
+    with open(recording, "wb") as file:
+        pickle.dump([np.full((2, 2), n) for n in range(6)], file)
+
+    capture = VideoCapture(str(recording))
+    stamps = [capture.readStamped() for _ in range(2)]
+    ret, frame = capture.read()
+
+    assert [sequence for _, _, _, sequence in stamps] == [1, 2]
+    assert stamps[0][2] <= stamps[1][2] <= capture.timestamp
+    assert capture.sequence == 3 and frame[0, 0] == 4 and not ret
+    assert capture.getStats() == {"captured": 3, "dropped": 0}
@@ -0,0 +1,72 @@
+"""Side by side benchmark of landmark backends on CPU using tests/test_data.
+
+Usage: python tools/benchmark_backends.py [--frames N] [--onnx face_landmark.onnx] [--detector yunet.onnx]
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from eyeGestures.face import FaceFinder, Face
+from eyeGestures.frame import Frame
+from eyeGestures.landmarkBackends import MediaPipeBackend, OpenCVDNNBackend, PrecomputedBackend
+
+TEST_DATA = os.path.join(os.path.dirname(__file__), "..", "tests", "test_data")
+
+
+def run(finder, image, frames):
+    """Function returning mean time per frame of finding and processing face, and landmarks from last frame"""
+
+    face = Face()
+    elapsed = []
+    for _ in range(frames):
+        frame = Frame(image, "BGR", mirrored=True)
+        start = time.perf_counter()
+        landmarks = finder.find(frame)
+        if landmarks is None:
+            return None, None
+        face.process(frame, landmarks)
+        elapsed.append(time.perf_counter() - start)
+    return np.mean(elapsed[len(elapsed) // 4:]), face.getLandmarks().copy()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=50)
+    parser.add_argument("--onnx", default=None, help="face landmark ONNX model for OpenCV DNN backend")
+    parser.add_argument("--detector", default=None, help="YuNet face detector ONNX model")
+    args = parser.parse_args()
+
+    for name in ["face_1.jpg", "face_2.jpg"]:
+        image = cv2.imread(os.path.join(TEST_DATA, name))
+        reference = MediaPipeBackend(static_image_mode=True).process(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+
+        backends = {
+            "mediapipe": lambda: MediaPipeBackend(),
+            # without inference, lower bound of per frame cost
+            "precomputed": lambda: PrecomputedBackend([reference[0]] * args.frames),
+        }
+        if args.onnx is not None:
+            backends["opencv-dnn"] = lambda: OpenCVDNNBackend(args.onnx, args.detector)
+
+        results = dict()
+        for backend_name, backend in backends.items():
+            elapsed, landmarks = run(FaceFinder(backend=backend()), image, args.frames)
+            results[backend_name] = landmarks
+            if elapsed is None:
+                print(f"{name} {backend_name}: no face found")
+                continue
+
+            difference = np.mean(np.linalg.norm(landmarks - results["mediapipe"], axis=1))
+            print(f"{name} {backend_name}: {elapsed * 1e3:.2f} ms per frame, "
+                  f"mean difference to mediapipe {difference:.2f} px")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Benchmark of FaceFinder inference on 1080p frames built from tests/test_data.
+
+Usage: python tools/benchmark_finder.py [frames]
+"""
+
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from eyeGestures.face import FaceFinder, Face
+from eyeGestures.frame import Frame
+
+TEST_DATA = os.path.join(os.path.dirname(__file__), "..", "tests", "test_data")
+
+
+def make_frame(name, width=1920, height=1080):
+    """Function placing test face in the middle of camera sized frame"""
+
+    face = cv2.imread(os.path.join(TEST_DATA, name))
+    face = cv2.resize(face, None, fx=1.5, fy=1.5)
+    frame = np.full((height, width, 3), 127, dtype=np.uint8)
+    y = (height - face.shape[0]) // 2
+    x = (width - face.shape[1]) // 2
+    frame[y:y + face.shape[0], x:x + face.shape[1]] = face
+    return frame
+
+
+def run(finder, image, frames):
+    """Function returning mean time per frame and landmarks from last frame"""
+
+    face = Face()
+    elapsed = []
+    for _ in range(frames):
+        frame = Frame(image, "BGR", mirrored=True)
+        start = time.perf_counter()
+        face_mesh = finder.find(frame, face.getBoundingBox())
+        face.process(frame, face_mesh, finder.roi)
+        elapsed.append(time.perf_counter() - start)
+    # first frames include detection and model warm up
+    return np.mean(elapsed[len(elapsed) // 4:]), face.getLandmarks().copy()
+
+
+def main(frames=100):
+    for name in ["face_1.jpg", "face_2.jpg"]:
+        image = make_frame(name)
+
+        full_time, full_landmarks = run(FaceFinder(), image, frames)
+        roi_time, roi_landmarks = run(FaceFinder(tracking=True), image, frames)
+        adaptive = FaceFinder(adaptive=True)
+        adaptive_time, adaptive_landmarks = run(adaptive, image, frames)
+
+        error = np.mean(np.linalg.norm(full_landmarks - roi_landmarks, axis=1))
+        adaptive_error = np.mean(np.linalg.norm(full_landmarks - adaptive_landmarks, axis=1))
+        print(f"{name} {image.shape[1]}x{image.shape[0]}: "
+              f"full frame {full_time * 1e3:.2f} ms, "
+              f"tracked roi {roi_time * 1e3:.2f} ms, "
+              f"speedup {full_time / roi_time:.1f}x, "
+              f"mean landmark difference {error:.2f} px")
+        print(f"{name} adaptive scale {adaptive.scale}: "
+              f"{adaptive_time * 1e3:.2f} ms, "
+              f"speedup {full_time / adaptive_time:.1f}x, "
+              f"mean landmark difference {adaptive_error:.2f} px, "
+              f"latency per scale {adaptive.getStats()['latency']}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100)
@@ -0,0 +1,68 @@
+"""Microbenchmark comparing landmark extraction in Face._landmarks with legacy per-landmark loop.
+
+Usage: python tools/benchmark_landmarks.py [repeats]
+"""
+
+import os
+import sys
+import glob
+import timeit
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from eyeGestures.face import Face
+from eyeGestures.landmarkBackends import MediaPipeBackend
+
+TEST_DATA = os.path.join(os.path.dirname(__file__), "..", "tests", "test_data")
+
+
+def legacy_landmarks(face_mesh, image_w, image_h):
+    """Landmark extraction as done before vectorization"""
+
+    face_landmarks = []
+    for landmark in face_mesh.multi_face_landmarks[0].landmark:
+        face_landmarks.append((
+            landmark.x * image_w,
+            landmark.y * image_h))
+
+    return np.array(face_landmarks)
+
+
+def main(repeats=1000):
+    for path in sorted(glob.glob(os.path.join(TEST_DATA, "face_*.jpg"))):
+        image = cv2.imread(path)
+        image_h, image_w, _ = image.shape
+
+        face_mesh = MediaPipeBackend().mp_face_mesh.process(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+        if face_mesh.multi_face_landmarks is None:
+            print(f"{os.path.basename(path)}: no face found")
+            continue
+
+        face = Face(full_mesh=True)
+        face.process(image, face_mesh)
+        subset_face = Face()
+        subset_face.process(image, face_mesh)
+
+        reference = legacy_landmarks(face_mesh, image_w, image_h)
+        error = np.max(np.abs(face.getLandmarks() - reference))
+
+        legacy_time = min(timeit.repeat(
+            lambda: legacy_landmarks(face_mesh, image_w, image_h), number=repeats, repeat=5)) / repeats
+        vectorized_time = min(timeit.repeat(
+            lambda: face._landmarks(face_mesh), number=repeats, repeat=5)) / repeats
+        subset_time = min(timeit.repeat(
+            lambda: subset_face._landmarks(face_mesh), number=repeats, repeat=5)) / repeats
+
+        print(f"{os.path.basename(path)}: "
+              f"legacy {legacy_time * 1e6:.1f} us, "
+              f"vectorized {vectorized_time * 1e6:.1f} us, "
+              f"subset {subset_time * 1e6:.1f} us, "
+              f"speedup {legacy_time / vectorized_time:.1f}x, "
+              f"max error {error:.2e} px")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
@@ -0,0 +1,41 @@
+"""Benchmark of sequential EyeGestures_v3.step against pipelined runner on 1080p frames.
+
+Usage: python tools/benchmark_pipeline.py [frames]
+"""
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from eyeGestures import EyeGestures_v3
+from benchmark_finder import make_frame
+
+
+def main(frames=200):
+    images = [make_frame("face_1.jpg"), make_frame("face_2.jpg")]
+    stream = [images[(n // 50) % 2] for n in range(frames)]
+
+    gestures = EyeGestures_v3()
+    start = time.perf_counter()
+    for frame in stream:
+        gestures.step(frame, False, 1920, 1080)
+    sequential = frames / (time.perf_counter() - start)
+
+    gestures = EyeGestures_v3()
+    with gestures.pipeline() as pipeline:
+        start = time.perf_counter()
+        for _ in pipeline.map(stream, False, 1920, 1080):
+            pass
+        pipelined = frames / (time.perf_counter() - start)
+        stats = pipeline.getStats()
+
+    print(f"sequential {sequential:.1f} fps, pipelined {pipelined:.1f} fps")
+    for stage, stage_stats in stats.items():
+        per_frame = stage_stats["busy"] / max(stage_stats["frames"], 1) * 1e3
+        print(f"{stage}: {per_frame:.2f} ms per frame, occupancy {stage_stats['occupancy']:.2f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)